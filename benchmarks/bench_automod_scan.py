@@ -0,0 +1,50 @@
+"""Micro-benchmark: the original per-check content scans vs. one MessageFeatures pass.
+
+Run from the repository root:  python benchmarks/bench_automod_scan.py
+"""
+import os
+import random
+import re
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.automod import MessageFeatures
+
+
+def original_checks(content, mentions):
+    """What check_invites/mentions/caps/links did, each on its own, kept here as the baseline"""
+    has_invite = bool(re.search(r'(discord\.gg/|discord\.com/invite/|discordapp\.com/invite/)[\w-]+', content, re.IGNORECASE))
+    caps = sum(1 for c in content if c.isupper()) if len(content) >= 10 else 0
+    urls = re.findall(r'https?://[^\s]+', content)
+    domains = [url.split('/')[2].lower() for url in urls]
+    return has_invite, mentions, caps, domains
+
+
+def scanned_checks(content, mentions):
+    features = MessageFeatures(content, mentions)
+    return features.has_invite, features.mentions, features.caps if features.length >= 10 else 0, features.domains
+
+
+def main():
+    rng = random.Random(42)
+    extras = ["https://youtube.com/watch?v=abc", "discord.gg/vantax", "https://discord.com/invite/xyz", "HALLO ALLE", "www.example.org"]
+    messages = []
+    for _ in range(2000):
+        words = ["".join(rng.choice(string.ascii_letters) for _ in range(rng.randint(2, 9))) for _ in range(rng.randint(3, 60))]
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(extras))
+        messages.append((" ".join(words), rng.randint(0, 3)))
+
+    assert [original_checks(*m) for m in messages] == [scanned_checks(*m) for m in messages]
+
+    per_message = lambda func: timeit.timeit(lambda: [func(*m) for m in messages], number=5) / 5 / len(messages) * 1e6
+    original = per_message(original_checks)
+    scanned = per_message(scanned_checks)
+    print(f"original checks {original:6.2f} us/msg | MessageFeatures {scanned:6.2f} us/msg ({original / scanned:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Micro-benchmark: per-message cooldown check, ISO strings vs. CooldownTracker.
+
+Run from the repository root:  python benchmarks/bench_cooldown.py
+"""
+import datetime
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.level import CooldownTracker, XP_COOLDOWN
+
+
+def main():
+    users = [str(1000 + i) for i in range(10_000)]
+    stale = (datetime.datetime.now() - datetime.timedelta(seconds=60)).isoformat()
+    entries = {uid: {"last_message": stale} for uid in users}
+    tracker = CooldownTracker()
+    tracker._started -= XP_COOLDOWN  # steady state, past the startup seeding window
+    n = len(users)
+
+    def iso_check():
+        for uid in users:
+            entry = entries[uid]
+            now = datetime.datetime.now()
+            last_msg = entry.get("last_message")
+            if last_msg and (now - datetime.datetime.fromisoformat(last_msg)).seconds < XP_COOLDOWN:
+                continue
+            entry["last_message"] = now.isoformat()
+            entry["last_message"] = stale  # keep it expired
+
+    def tracker_check():
+        for uid in users:
+            key = ("1", uid)
+            now = time.monotonic()
+            tracker.seed(key, None, now)
+            if not tracker.ready(key, now):
+                continue
+            tracker.hit(key, now - 60)  # keep it expired
+
+    before = timeit.timeit(iso_check, number=5) / 5 / n * 1e9
+    after = timeit.timeit(tracker_check, number=5) / 5 / n * 1e9
+    print(f"ISO string cooldown: {before:7.0f} ns/message")
+    print(f"CooldownTracker:     {after:7.0f} ns/message ({before / after:.1f}x)")
+
+    for uid in users:
+        tracker.hit(("1", uid), time.monotonic() - 2 * XP_COOLDOWN)
+    expire_ms = timeit.timeit(tracker.expire, number=1) * 1e3
+    print(f"Bulk expire of {n} stale entries: {expire_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Micro-benchmark: substring allowlist scan vs. the reversed-label DomainTrie.
+
+Run from the repository root:  python benchmarks/bench_domain_trie.py
+"""
+import os
+import random
+import string
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.automod import DomainTrie
+
+
+def substring_match(allowed_domains, domain):
+    """The original check_links test, kept here as the baseline"""
+    return any(allowed in domain for allowed in allowed_domains)
+
+
+def random_domain(rng):
+    labels = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 12))) for _ in range(rng.randint(1, 2))]
+    return ".".join(labels + [rng.choice(("com", "net", "org", "io", "de", "xyz"))])
+
+
+def main():
+    rng = random.Random(42)
+
+    for count in (10, 1_000, 100_000):
+        domains = [random_domain(rng) for _ in range(count)]
+        tracemalloc.start()
+        build_ms = timeit.timeit(lambda: DomainTrie(domains), number=1) * 1e3
+        trie = DomainTrie(domains)
+        memory_mb = tracemalloc.get_traced_memory()[0] / 2**20
+        tracemalloc.stop()
+
+        hosts = [rng.choice(("www.", "cdn.", "")) + (rng.choice(domains) if rng.random() < 0.5 else random_domain(rng)) for _ in range(1000)]
+        per_lookup = lambda func: timeit.timeit(lambda: [func(h) for h in hosts], number=3) / 3 / len(hosts) * 1e6
+        substring = per_lookup(lambda h: substring_match(domains, h)) if count <= 1_000 else float("nan")
+        compiled = per_lookup(trie.match)
+        print(f"{count:>7} domains: substring {substring:9.2f} us/host | DomainTrie {compiled:5.2f} us/host | "
+              f"build {build_ms:7.1f} ms | ~{memory_mb:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
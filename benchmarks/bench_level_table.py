@@ -0,0 +1,41 @@
+"""Micro-benchmark: linear get_level_from_xp vs. the bisect LevelTable.
+
+Run from the repository root:  python benchmarks/bench_level_table.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.level import LevelTable, get_xp_for_level, np
+
+
+def linear_level_from_xp(xp):
+    """The original implementation, kept here as the baseline"""
+    level = 1
+    while xp >= get_xp_for_level(level + 1):
+        level += 1
+    return level
+
+
+def main():
+    table = LevelTable()
+    for max_level in (10, 100, 1000):
+        rng = random.Random(max_level)
+        xp_values = [rng.randrange(0, get_xp_for_level(max_level)) for _ in range(1000)]
+        assert [linear_level_from_xp(xp) for xp in xp_values] == table.levels_from_xp(xp_values)
+
+        linear = timeit.timeit(lambda: [linear_level_from_xp(xp) for xp in xp_values], number=5) / 5
+        bisect = timeit.timeit(lambda: [table.level_from_xp(xp) for xp in xp_values], number=5) / 5
+        bulk = timeit.timeit(lambda: table.levels_from_xp(xp_values), number=5) / 5
+
+        print(f"levels <= {max_level:>4}: linear {linear * 1e3:8.2f} ms | "
+              f"bisect {bisect * 1e3:6.2f} ms ({linear / bisect:6.1f}x) | "
+              f"bulk{' (numpy)' if np is not None else ''} {bulk * 1e3:6.2f} ms ({linear / bulk:6.1f}x) "
+              f"per 1000 values")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Micro-benchmark: full sort per query vs. the incremental RankIndex.
+
+Run from the repository root:  python benchmarks/bench_rank_index.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.level import RankIndex
+
+
+def main():
+    for members in (1_000, 10_000, 100_000):
+        rng = random.Random(members)
+        xp = {str(rng.getrandbits(60)): rng.randrange(0, 5_000_000) for _ in range(members)}
+        uids = list(xp)
+        index = RankIndex(xp.items())
+
+        def sort_rank():
+            uid = rng.choice(uids)
+            ordered = sorted(xp.items(), key=lambda x: x[1], reverse=True)
+            return next(i + 1 for i, (u, _) in enumerate(ordered) if u == uid)
+
+        def update():
+            uid = rng.choice(uids)
+            xp[uid] += 20
+            index.update(uid, xp[uid])
+
+        n = 2000
+        sort_ms = timeit.timeit(sort_rank, number=5) / 5 * 1e3
+        update_us = timeit.timeit(update, number=n) / n * 1e6
+        rank_us = timeit.timeit(lambda: index.rank(rng.choice(uids)), number=n) / n * 1e6
+        page_us = timeit.timeit(lambda: index.page(rng.randrange(members - 10), 10), number=n) / n * 1e6
+
+        print(f"{members:>7} members: sort+scan {sort_ms:8.2f} ms | update {update_us:5.1f} us | "
+              f"rank {rank_us:5.1f} us | page of 10 {page_us:5.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -160,6 +160,9 @@ async def help_slash(interaction: discord.Interaction):
     embed.add_field(name="🏆 Levelsystem", value="""
     `/level [mitglied]` - Zeigt dein Level an
     `/leaderboard` - Zeigt die Top 10 Nutzer
+    `/seasons` - Zeigt vergangene XP-Saisons
+    `/seasonleaderboard [saison]` - Top 10 einer vergangenen Saison
+    `/seasonreset` - Beendet die aktuelle Saison (Admin)
     """, inline=False)
     
     # Moderation
@@ -184,7 +187,7 @@ async def funktionen_slash(interaction: discord.Interaction):
     embed = discord.Embed(title="VANTAX Funktionen", color=VANTAX_COLOR)
     embed.add_field(name="Moderation", value="/kick, /ban, /clear mit Bestätigung und Logging, /modlogs", inline=False)
     embed.add_field(name="Begrüßung & Logging", value="Customizable Willkommens-Embeds, Rollenvergabe, Log-Channel für Join/Leave/Ban usw.", inline=False)
-    embed.add_field(name="Level & XP", value="Automatisches XP-System, /level, /leaderboard", inline=False)
+    embed.add_field(name="Level & XP", value="Automatisches XP-System (Nachrichten & Voice), /level, /leaderboard, Saisons mit /seasons, /seasonleaderboard, /seasonreset", inline=False)
     embed.add_field(name="Fun", value="/meme (mit Button), /zufall (mit Button), /love, /heart, /iloveyou, /cuddle, /hug, /kiss, /fuck, /poll, /endpoll, /remind, /reminders, /delreminder, /birthday, /birthdays", inline=False)
     embed.add_field(name="Sicherheit", value="/automod (Schutz vor Spam, Bad Words, etc.), /antiraid (Raid-Schutz, Lockdown), /security (2FA, Rate Limits, Audit Logging, Memory Management)", inline=False)
     embed.add_field(name="Datenbank", value="/database (SQLite/MySQL/PostgreSQL Support, Backup, Query, Management)", inline=False)
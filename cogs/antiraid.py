@@ -3,57 +3,420 @@ from discord import app_commands
 from discord.ext import commands
 import json
 import os
+import tempfile
 import asyncio
+import io
+import time
+import unicodedata
+from collections import deque
 from datetime import datetime, timedelta
 
 # Constants
 VANTAX_COLOR = discord.Color.blurple()
 VANTAX_FOOTER = "VANTAX Discord Bot by Maurice"
 
+# Lockdown: channels changed at once (discord.py waits out per-route 429s itself),
+# and how often progress is reported while it runs
+LOCKDOWN_CONCURRENCY = 8
+LOCKDOWN_PROGRESS_INTERVAL = 2.0
+
+# Raid punishments: parallel kicks/bans, and retries with exponential backoff on 429/5xx
+RAID_PUNISH_WORKERS = 5
+RAID_PUNISH_RETRIES = 4
+RAID_PUNISH_BACKOFF = 1.0
+
+# Join clusters: how long joins are compared, the creation-time bin width (s), how many
+# matching joins make a full match, and how much each fingerprint adds to the score
+CLUSTER_WINDOW = 900
+CLUSTER_MAX_JOINS = 500
+CLUSTER_CREATION_BIN = 600
+CLUSTER_MIN_SIZE = 3
+CLUSTER_WEIGHTS = {"name": 0.4, "created": 0.35, "avatar": 0.25, "default_avatar": 0.1}
+CLUSTER_THRESHOLD = 0.7
+
+# Persistence: how often changed guilds are written, and how many journal lines
+# are kept before the snapshot is rewritten
+STATE_FLUSH_INTERVAL = 5
+STATE_COMPACT_LINES = 500
+
+# Raid history: detailed entries kept per guild, and hourly count buckets (14 days)
+SUSPICIOUS_JOIN_LIMIT = 100
+ALERT_LIMIT = 25
+HISTORY_BUCKETS = 24 * 14
+
+class GuildStateStore:
+    """A per-guild JSON file, persisted as a snapshot plus a JSONL journal.
+
+    mark() flags a guild as changed and flush() appends one line with the
+    whole state of each changed guild, so disk writes follow the changes
+    instead of rewriting every guild. Replaying full states is idempotent,
+    which lets compact() rewrite the snapshot and empty the journal
+    without a rotation step.
+
+    Each guild is encoded once per change, on the event loop (its deques
+    are mutated there), and the text is kept in _encoded: the journal line
+    and the next snapshot both reuse it, and the file I/O runs in a thread.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = os.path.splitext(path)[0] + ".jsonl"
+        self.data = {}
+        self.dirty = set()
+        self.journal_lines = 0
+        self._journal = None
+        self._encoded = {}
+        # Serializes journal appends and compactions
+        self._lock = asyncio.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.data = json.load(f)
+        except Exception as e:
+            print(f"Error loading {self.path}: {e}")
+            self.data = {}
+
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        guild_id, state = record["guild_id"], record["state"]
+                    except (ValueError, KeyError, TypeError):
+                        # Torn last line from a crash
+                        continue
+                    self.journal_lines += 1
+                    if state is None:
+                        self.data.pop(guild_id, None)
+                    else:
+                        self.data[guild_id] = state
+        self._encoded = {guild_id: self.encode(state) for guild_id, state in self.data.items()}
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        if self.journal_lines >= STATE_COMPACT_LINES:
+            # Startup runs before the loop serves events, so this may block
+            self._compact_files(self._encoded)
+
+    @staticmethod
+    def encode(state):
+        # default=list writes the ring buffers (deques) as JSON arrays
+        return json.dumps(state, ensure_ascii=False, default=list)
+
+    def mark(self, guild_id):
+        self.dirty.add(str(guild_id))
+
+    async def flush(self):
+        """Append the changed guilds to the journal; returns how many were written"""
+        if not self.dirty:
+            return 0
+        dirty, self.dirty = self.dirty, set()
+        lines = []
+        for guild_id in dirty:
+            state = self.data.get(guild_id)
+            if state is None:
+                self._encoded.pop(guild_id, None)
+                text = "null"
+            else:
+                text = self._encoded[guild_id] = self.encode(state)
+            lines.append('{"guild_id": ' + json.dumps(guild_id) + ', "state": ' + text + '}\n')
+        try:
+            async with self._lock:
+                await asyncio.to_thread(self._append, "".join(lines))
+                self.journal_lines += len(lines)
+        except Exception as e:
+            print(f"Error writing {self.journal_path}: {e}")
+            self.dirty |= dirty
+            return 0
+        if self.journal_lines >= STATE_COMPACT_LINES:
+            await self.compact()
+        return len(dirty)
+
+    def _append(self, text):
+        self._journal.write(text)
+        self._journal.flush()
+
+    async def compact(self):
+        """Write all guilds to a fresh snapshot atomically, then empty the journal"""
+        async with self._lock:
+            # Every journaled line has its text in _encoded already, so the copy covers the journal
+            await asyncio.to_thread(self._compact_files, dict(self._encoded))
+
+    def _compact_files(self, encoded):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        prefix = "." + os.path.splitext(os.path.basename(self.path))[0] + "-"
+        fd, tmp_path = tempfile.mkstemp(prefix=prefix, suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write("{" + ", ".join(json.dumps(guild_id) + ": " + text for guild_id, text in encoded.items()) + "}")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._journal.seek(0)
+            self._journal.truncate()
+            self.journal_lines = 0
+        except Exception as e:
+            print(f"Error compacting {self.path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def close(self):
+        """Flush, and leave a current snapshot behind on a clean shutdown"""
+        await self.flush()
+        if self.journal_lines:
+            await self.compact()
+        self._journal.close()
+
+class JoinRateDetector:
+    """Recent member joins per guild as (time.monotonic(), member id, name).
+
+    Each deque is trimmed to the time window when a join arrives, so the
+    raid check runs on exact counts at the moment of the join and nothing
+    has to sweep the guilds in between.
+    """
+
+    def __init__(self):
+        self._joins = {}
+
+    def record(self, guild_id, member, now, time_window):
+        """Add a join and return how many fall inside the window"""
+        joins = self._joins.get(guild_id)
+        if joins is None:
+            joins = self._joins[guild_id] = deque()
+        cutoff = now - time_window
+        while joins and joins[0][0] <= cutoff:
+            joins.popleft()
+        joins.append((now, member.id, member.name))
+        return len(joins)
+
+    def count(self, guild_id, time_window, now=None):
+        joins = self._joins.get(guild_id)
+        if not joins:
+            return 0
+        cutoff = (time.monotonic() if now is None else now) - time_window
+        return sum(1 for joined, _, _ in joins if joined > cutoff)
+
+    def recent(self, guild_id):
+        """(member id, name) of the joins still held for a guild, oldest first"""
+        return [(member_id, name) for _, member_id, name in self._joins.get(guild_id, ())]
+
+    def last_join(self, guild_id):
+        joins = self._joins.get(guild_id)
+        return joins[-1][0] if joins else None
+
+    def clear(self, guild_id):
+        self._joins.pop(guild_id, None)
+
+class JoinClusterIndex:
+    """Fingerprints of recent joins per guild, for spotting raid clusters.
+
+    Every join is indexed under three kinds of keys: its username stem
+    together with all one-character deletions of it (two names within
+    edit distance 1 share a key), its avatar hash, and the bin of its
+    account creation time. Counts per key are updated incrementally as
+    joins arrive and expire, so scoring a join costs O(name length).
+    """
+
+    def __init__(self, window=None, max_joins=None):
+        self.window = CLUSTER_WINDOW if window is None else window
+        self.max_joins = CLUSTER_MAX_JOINS if max_joins is None else max_joins
+        self._guilds = {}
+
+    @staticmethod
+    def name_keys(name):
+        """Stem (lowercase letters only, unless that leaves too little) and its deletion neighbours"""
+        name = unicodedata.normalize("NFKC", name).casefold()
+        stem = "".join(c for c in name if c.isalpha())
+        if len(stem) < 3:
+            stem = "".join(c for c in name if c.isalnum()) or name
+        keys = {stem}
+        if len(stem) > 3:
+            keys.update(stem[:i] + stem[i + 1:] for i in range(len(stem)))
+        return tuple(keys)
+
+    @staticmethod
+    def fingerprint(member):
+        avatar = member.avatar.key if member.avatar else None
+        created_bin = int(member.created_at.timestamp() // CLUSTER_CREATION_BIN)
+        return JoinClusterIndex.name_keys(member.name), avatar, created_bin
+
+    def _expire(self, index, now):
+        joins = index["joins"]
+        cutoff = now - self.window
+        while joins and (joins[0][0] <= cutoff or len(joins) > self.max_joins):
+            _, name_keys, avatar, created_bin = joins.popleft()
+            for counts, key in [(index["names"], key) for key in name_keys] + [(index["avatars"], avatar), (index["created"], created_bin)]:
+                if counts[key] <= 1:
+                    del counts[key]
+                else:
+                    counts[key] -= 1
+
+    def add(self, guild_id, member, now):
+        """Score a join against the recent joins (0.0 to 1.0), then index it"""
+        index = self._guilds.get(guild_id)
+        if index is None:
+            index = self._guilds[guild_id] = {"joins": deque(), "names": {}, "avatars": {}, "created": {}}
+        self._expire(index, now)
+
+        name_keys, avatar, created_bin = self.fingerprint(member)
+        names, avatars, created = index["names"], index["avatars"], index["created"]
+
+        similar_names = max(names.get(key, 0) for key in name_keys)
+        same_avatar = avatars.get(avatar, 0)
+        close_created = created.get(created_bin - 1, 0) + created.get(created_bin, 0) + created.get(created_bin + 1, 0)
+
+        def part(count):
+            return min(count / CLUSTER_MIN_SIZE, 1.0)
+
+        # Default avatars are common among normal users, so they weigh less
+        avatar_weight = CLUSTER_WEIGHTS["avatar"] if avatar is not None else CLUSTER_WEIGHTS["default_avatar"]
+        score = (
+            CLUSTER_WEIGHTS["name"] * part(similar_names)
+            + CLUSTER_WEIGHTS["created"] * part(close_created)
+            + avatar_weight * part(same_avatar)
+        )
+
+        index["joins"].append((now, name_keys, avatar, created_bin))
+        for key in name_keys:
+            names[key] = names.get(key, 0) + 1
+        avatars[avatar] = avatars.get(avatar, 0) + 1
+        created[created_bin] = created.get(created_bin, 0) + 1
+        self._expire(index, now)
+        return round(score, 2)
+
+    def clear(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+class RaidPunishment:
+    """Kicks or bans the members of one raid with a pool of workers.
+
+    Members are queued once each, including joins that arrive while the
+    raid is still going. Rate limits and server errors are retried with
+    backoff, and the outcome for every member is kept for the report.
+    """
+
+    def __init__(self, guild, action, workers=RAID_PUNISH_WORKERS):
+        self.guild = guild
+        self.action = action
+        self.outcomes = {}
+        self._queue = asyncio.Queue()
+        self._seen = set()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(workers)]
+
+    def add(self, member_id, name):
+        """Queue a member; returns False if they were already queued or handled"""
+        if member_id in self._seen:
+            return False
+        self._seen.add(member_id)
+        self._queue.put_nowait((member_id, name))
+        return True
+
+    async def _worker(self):
+        while True:
+            member_id, name = await self._queue.get()
+            try:
+                self.outcomes[member_id] = (name, *await self._punish(member_id))
+            except Exception as e:
+                self.outcomes[member_id] = (name, f"failed ({e})", 0)
+            finally:
+                self._queue.task_done()
+
+    async def _punish(self, member_id):
+        """(outcome, attempts) for one member"""
+        reason = "AntiRaid: Raid detected"
+        for attempt in range(1, RAID_PUNISH_RETRIES + 1):
+            try:
+                if self.action == "ban":
+                    # Works for members who already left, too
+                    await self.guild.ban(discord.Object(id=member_id), reason=reason)
+                    return "banned", attempt
+                member = self.guild.get_member(member_id)
+                if member is None:
+                    return "gone", attempt
+                await self.guild.kick(member, reason=reason)
+                return "kicked", attempt
+            except discord.NotFound:
+                return "gone", attempt
+            except discord.Forbidden:
+                return "forbidden", attempt
+            except discord.HTTPException as e:
+                if (e.status == 429 or e.status >= 500) and attempt < RAID_PUNISH_RETRIES:
+                    await asyncio.sleep(RAID_PUNISH_BACKOFF * 2 ** (attempt - 1))
+                    continue
+                return f"failed ({e.status})", attempt
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def summary(self):
+        counts = {}
+        for _, outcome, _ in self.outcomes.values():
+            counts[outcome] = counts.get(outcome, 0) + 1
+        return counts
+
+    async def close(self, timeout=60):
+        """Finish the queue (up to timeout seconds), then stop the workers"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"Raid punishment not finished, {self.pending} members left")
+        for worker in self._workers:
+            worker.cancel()
+
 class AntiRaid(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.antiraid_file = "antiraid_config.json"
-        self.antiraid_config = self.load_antiraid_config()
-        self.raid_data_file = "raid_data.json"
-        self.raid_data = self.load_raid_data()
+        self.config_store = GuildStateStore("antiraid_config.json")
+        self.antiraid_config = self.config_store.data
+        self.raid_store = GuildStateStore("raid_data.json")
+        self.raid_data = self.raid_store.data
+        # Join times per guild, and the tasks that end a raid or lockdown on time
+        self.joins = JoinRateDetector()
+        self.clusters = JoinClusterIndex()
+        self.raid_watchers = {}
+        self.lockdown_timers = {}
+        # Serializes lockdown and lift per guild
+        self.lockdown_locks = {}
+        # Kick/ban pipelines of the raids in progress
+        self.raid_punishments = {}
         
-        # Start monitoring task
+        # Start monitoring and persistence tasks
         self.bot.loop.create_task(self.monitor_raid())
+        self.persist_task = self.bot.loop.create_task(self.persist_state())
     
-    def load_antiraid_config(self):
-        try:
-            if os.path.exists(self.antiraid_file):
-                with open(self.antiraid_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
-        except Exception as e:
-            print(f"Error loading antiraid config: {e}")
-            return {}
+    async def save_antiraid_config(self, guild_id):
+        """Config changes come from commands, so they are written right away"""
+        self.config_store.mark(guild_id)
+        await self.config_store.flush()
     
-    def save_antiraid_config(self):
-        try:
-            with open(self.antiraid_file, 'w', encoding='utf-8') as f:
-                json.dump(self.antiraid_config, f, indent=4, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error saving antiraid config: {e}")
+    def save_raid_data(self, guild_id):
+        """Mark a guild's raid state as changed; persist_state writes it soon"""
+        self.raid_store.mark(guild_id)
     
-    def load_raid_data(self):
-        try:
-            if os.path.exists(self.raid_data_file):
-                with open(self.raid_data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
-        except Exception as e:
-            print(f"Error loading raid data: {e}")
-            return {}
+    async def flush_raid_data(self, guild_id):
+        """Write a guild's raid state now, for changes that must survive a crash"""
+        self.raid_store.mark(guild_id)
+        await self.raid_store.flush()
     
-    def save_raid_data(self):
-        try:
-            with open(self.raid_data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.raid_data, f, indent=4, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error saving raid data: {e}")
+    def record_history(self, raid_data, event):
+        """Count an event in the guild's hourly history, keeping HISTORY_BUCKETS hours"""
+        history = raid_data.setdefault("history", {})
+        bucket = history.setdefault(datetime.now().strftime("%Y-%m-%dT%H"), {})
+        bucket[event] = bucket.get(event, 0) + 1
+        if len(history) > HISTORY_BUCKETS:
+            for key in sorted(history)[:-HISTORY_BUCKETS]:
+                del history[key]
+    
+    def history_totals(self, raid_data, hours):
+        cutoff = (datetime.now() - timedelta(hours=hours)).strftime("%Y-%m-%dT%H")
+        totals = {}
+        for key, bucket in raid_data.get("history", {}).items():
+            if key > cutoff:
+                for event, count in bucket.items():
+                    totals[event] = totals.get(event, 0) + count
+        return totals
     
     def get_guild_config(self, guild_id):
         guild_id_str = str(guild_id)
@@ -68,6 +431,7 @@ class AntiRaid(commands.Cog):
                 "lockdown_duration": 300,
                 "verification_required": False,
                 "min_account_age": 86400,  # 24 hours in seconds
+                "cluster_threshold": CLUSTER_THRESHOLD,
                 "new_member_role": None
             }
         return self.antiraid_config[guild_id_str]
@@ -82,51 +446,86 @@ class AntiRaid(commands.Cog):
                 "lockdown_start": None,
                 "alerts_sent": []
             }
-        return self.raid_data[guild_id_str]
+        raid_data = self.raid_data[guild_id_str]
+        # Detail lists are ring buffers; older entries only live on in the history counts
+        for key, limit in (("suspicious_joins", SUSPICIOUS_JOIN_LIMIT), ("alerts_sent", ALERT_LIMIT)):
+            if not isinstance(raid_data.get(key), deque):
+                raid_data[key] = deque(raid_data.get(key) or (), maxlen=limit)
+        return raid_data
     
     async def monitor_raid(self):
-        """Monitor for raid activity"""
+        """Resume lockdown timers after a restart; joins are checked as they arrive"""
         await self.bot.wait_until_ready()
         
-        while not self.bot.is_closed():
+        for guild_id_str, raid_data in list(self.raid_data.items()):
             try:
-                # Clean old join data
-                await self.clean_old_join_data()
-                await asyncio.sleep(10)
+                if raid_data.get("raid_detected", False):
+                    # The join times did not survive the restart, so the raid is over
+                    raid_data["raid_detected"] = False
+                    raid_data["recent_joins"] = []
+                    self.save_raid_data(guild_id_str)
+                if raid_data.get("lockdown_active", False) and raid_data.get("lockdown_start"):
+                    config = self.get_guild_config(int(guild_id_str))
+                    elapsed = (datetime.now() - datetime.fromisoformat(raid_data["lockdown_start"])).total_seconds()
+                    self.schedule_lockdown_lift(int(guild_id_str), config.get("lockdown_duration", 300) - elapsed)
             except Exception as e:
                 print(f"Error in monitor_raid: {e}")
-                await asyncio.sleep(10)
     
-    async def clean_old_join_data(self):
-        """Clean old join data"""
+    async def persist_state(self):
+        """Write the guilds whose raid state changed, every STATE_FLUSH_INTERVAL seconds"""
+        while True:
+            await asyncio.sleep(STATE_FLUSH_INTERVAL)
+            try:
+                await self.raid_store.flush()
+            except Exception as e:
+                print(f"Error persisting raid data: {e}")
+    
+    async def watch_raid_end(self, guild, config):
+        """End the raid once a whole time window passes without joins"""
+        time_window = config.get("time_window", 30)
         try:
-            current_time = datetime.now()
+            while True:
+                last_join = self.joins.last_join(guild.id)
+                delay = time_window if last_join is None else last_join + time_window - time.monotonic()
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
             
-            for guild_id_str, guild_config in self.antiraid_config.items():
-                time_window = guild_config.get("time_window", 30)
-                cutoff_time = current_time - timedelta(seconds=time_window)
-                
-                if guild_id_str in self.raid_data:
-                    raid_data = self.raid_data[guild_id_str]
-                    
-                    # Clean old joins
-                    raid_data["recent_joins"] = [
-                        join for join in raid_data["recent_joins"]
-                        if datetime.fromisoformat(join["timestamp"]) > cutoff_time
-                    ]
-                    
-                    # Check if lockdown should be lifted
-                    if raid_data.get("lockdown_active", False):
-                        lockdown_duration = guild_config.get("lockdown_duration", 300)
-                        lockdown_start = datetime.fromisoformat(raid_data["lockdown_start"])
-                        
-                        if (current_time - lockdown_start).total_seconds() > lockdown_duration:
-                            await self.lift_lockdown(int(guild_id_str))
-            
-            self.save_raid_data()
+            raid_data = self.get_guild_raid_data(guild.id)
+            raid_data["raid_detected"] = False
+            raid_data["recent_joins"] = []
+            self.save_raid_data(guild.id)
+            await self.log_action(guild, "✅ Raid vorbei: keine Joins mehr im Zeitfenster")
             
+            pipeline = self.raid_punishments.pop(guild.id, None)
+            if pipeline is not None:
+                await pipeline.close()
+                await self.send_punishment_report(guild, pipeline)
         except Exception as e:
-            print(f"Error cleaning old join data: {e}")
+            print(f"Error watching raid end: {e}")
+        finally:
+            self.raid_watchers.pop(guild.id, None)
+    
+    def schedule_lockdown_lift(self, guild_id, delay):
+        timer = self.lockdown_timers.pop(guild_id, None)
+        if timer is not None:
+            timer.cancel()
+        self.lockdown_timers[guild_id] = asyncio.create_task(self.lift_lockdown_later(guild_id, max(delay, 0)))
+    
+    async def lift_lockdown_later(self, guild_id, delay):
+        await asyncio.sleep(delay)
+        # lift_lockdown cancels timers, which must not cancel this task mid-lift
+        self.lockdown_timers.pop(guild_id, None)
+        await self.lift_lockdown(guild_id)
+    
+    async def cog_unload(self):
+        for task in list(self.raid_watchers.values()) + list(self.lockdown_timers.values()):
+            task.cancel()
+        for pipeline in self.raid_punishments.values():
+            await pipeline.close(timeout=5)
+        self.persist_task.cancel()
+        await self.raid_store.close()
+        await self.config_store.close()
     
     @commands.Cog.listener()
     async def on_member_join(self, member):
@@ -141,49 +540,51 @@ class AntiRaid(commands.Cog):
         if not config.get("enabled", False):
             return
         
-        # Check account age
+        # Similarity to the other recent joins (name, avatar, creation time)
+        now = time.monotonic()
+        cluster_score = self.clusters.add(member.guild.id, member, now)
+        
+        # Check account age (created_at is timezone-aware)
         min_account_age = config.get("min_account_age", 86400)
-        account_age = (datetime.now() - member.created_at).total_seconds()
+        account_age = (discord.utils.utcnow() - member.created_at).total_seconds()
         
         if account_age < min_account_age:
-            await self.handle_suspicious_join(member, config, "new_account")
+            await self.handle_suspicious_join(member, config, "new_account", cluster_score)
             return
         
-        # Add to recent joins
-        raid_data["recent_joins"].append({
-            "user_id": str(member.id),
-            "username": member.name,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        # Check for raid
+        # Check for raid on the exact join count of the window
         join_threshold = config.get("join_threshold", 5)
         time_window = config.get("time_window", 30)
         
-        recent_count = len(raid_data["recent_joins"])
+        recent_count = self.joins.record(member.guild.id, member, now, time_window)
         
         if recent_count >= join_threshold and not raid_data.get("raid_detected", False):
             await self.detect_raid(member.guild, config, raid_data, recent_count)
+        elif member.guild.id in self.raid_punishments:
+            # Raid still running: this join goes straight into the pipeline
+            self.raid_punishments[member.guild.id].add(member.id, member.name)
+        elif cluster_score >= config.get("cluster_threshold", CLUSTER_THRESHOLD):
+            await self.handle_suspicious_join(member, config, "join_cluster", cluster_score)
+            return
         
         # Apply verification if required
         if config.get("verification_required", False):
             await self.apply_verification(member, config)
     
-    async def handle_suspicious_join(self, member, config, reason):
-        """Handle suspicious joins"""
+    async def handle_suspicious_join(self, member, config, reason, cluster_score=0.0):
+        """Handle suspicious joins; cluster_score is the join's similarity to recent joins"""
         guild_id = str(member.guild.id)
         raid_data = self.get_guild_raid_data(member.guild.id)
         
         # Add to suspicious joins
-        if "suspicious_joins" not in raid_data:
-            raid_data["suspicious_joins"] = []
-        
         raid_data["suspicious_joins"].append({
             "user_id": str(member.id),
             "username": member.name,
             "reason": reason,
+            "cluster_score": cluster_score,
             "timestamp": datetime.now().isoformat()
         })
+        self.record_history(raid_data, reason)
         
         # Apply punishment
         punishment = config.get("punishment", "kick")
@@ -191,45 +592,79 @@ class AntiRaid(commands.Cog):
         if punishment == "kick":
             try:
                 await member.guild.kick(member, reason=f"AntiRaid: Suspicious account ({reason})")
-                await self.log_action(member.guild, f"🛡️ Suspicious user kicked: {member.mention} ({reason})")
+                await self.log_action(member.guild, f"🛡️ Suspicious user kicked: {member.mention} ({reason}, Cluster {cluster_score:.2f})")
             except:
                 pass
         
         elif punishment == "ban":
             try:
                 await member.guild.ban(member, reason=f"AntiRaid: Suspicious account ({reason})")
-                await self.log_action(member.guild, f"🛡️ Suspicious user banned: {member.mention} ({reason})")
+                await self.log_action(member.guild, f"🛡️ Suspicious user banned: {member.mention} ({reason}, Cluster {cluster_score:.2f})")
             except:
                 pass
         
-        self.save_raid_data()
+        self.save_raid_data(member.guild.id)
     
     async def detect_raid(self, guild, config, raid_data, join_count):
         """Handle raid detection"""
-        raid_data["raid_detected"] = True
-        
-        # Send alert
-        await self.send_raid_alert(guild, config, raid_data, join_count)
+        # Taken now: the join window drops the first raiders as new joins arrive
+        raiders = self.joins.recent(guild.id)
         
-        # Apply auto-lockdown if enabled
-        if config.get("auto_lockdown", False):
-            await self.initiate_lockdown(guild, config)
+        raid_data["raid_detected"] = True
+        raid_data["recent_joins"] = [
+            {"user_id": str(member_id), "username": name}
+            for member_id, name in raiders
+        ]
+        raid_data["alerts_sent"].append({"timestamp": datetime.now().isoformat(), "join_count": join_count})
+        self.record_history(raid_data, "raid")
+        await self.flush_raid_data(guild.id)
+        if guild.id not in self.raid_watchers:
+            self.raid_watchers[guild.id] = asyncio.create_task(self.watch_raid_end(guild, config))
         
-        # Apply punishment to recent joins
+        # Punish recent joins, and later raid joins as they arrive; the pipeline
+        # exists before anything is awaited, so no join slips past it
         punishment = config.get("punishment", "kick")
         
-        for join in raid_data["recent_joins"]:
-            try:
-                member = guild.get_member(int(join["user_id"]))
-                if member:
-                    if punishment == "kick":
-                        await guild.kick(member, reason="AntiRaid: Raid detected")
-                    elif punishment == "ban":
-                        await guild.ban(member, reason="AntiRaid: Raid detected")
-            except:
-                pass
+        if punishment in ("kick", "ban") and guild.id not in self.raid_punishments:
+            pipeline = self.raid_punishments[guild.id] = RaidPunishment(guild, punishment)
+            for member_id, name in raiders:
+                pipeline.add(member_id, name)
         
-        self.save_raid_data()
+        # Send alert and apply auto-lockdown (if enabled) while the workers punish
+        actions = [self.send_raid_alert(guild, config, raid_data, join_count)]
+        if config.get("auto_lockdown", False):
+            actions.append(self.initiate_lockdown(guild, config))
+        await asyncio.gather(*actions)
+    
+    async def send_punishment_report(self, guild, pipeline):
+        """Outcome counts as an embed, one line per member as an attached file"""
+        try:
+            config = self.get_guild_config(guild.id)
+            alert_channel_id = config.get("alert_channel")
+            if not alert_channel_id:
+                return
+            
+            alert_channel = guild.get_channel(alert_channel_id)
+            if not alert_channel:
+                return
+            
+            summary = pipeline.summary()
+            embed = discord.Embed(
+                title="🛡️ Raid-Bestrafung abgeschlossen",
+                description="\n".join(f"**{outcome}:** {count}" for outcome, count in sorted(summary.items())) or "Keine Mitglieder",
+                color=discord.Color.orange()
+            )
+            embed.set_footer(text=VANTAX_FOOTER)
+            
+            lines = [
+                f"{member_id}\t{name}\t{outcome}\t{attempts}"
+                for member_id, (name, outcome, attempts) in pipeline.outcomes.items()
+            ]
+            report = io.BytesIO(("user_id\tusername\toutcome\tattempts\n" + "\n".join(lines)).encode("utf-8"))
+            await alert_channel.send(embed=embed, file=discord.File(report, filename="raid_punishments.tsv"))
+            
+        except Exception as e:
+            print(f"Error sending punishment report: {e}")
     
     async def send_raid_alert(self, guild, config, raid_data, join_count):
         """Send raid alert"""
@@ -268,29 +703,92 @@ class AntiRaid(commands.Cog):
         except Exception as e:
             print(f"Error sending raid alert: {e}")
     
-    async def initiate_lockdown(self, guild, config):
+    async def apply_overwrites(self, guild, changes, reason, progress=None):
+        """Set @everyone overwrites for (channel, overwrite) pairs concurrently.
+
+        At most LOCKDOWN_CONCURRENCY requests run at once. progress(done,
+        total, failed) is awaited every LOCKDOWN_PROGRESS_INTERVAL seconds
+        and once at the end. Returns the ids of the channels that changed
+        and the number of failures.
+        """
+        semaphore = asyncio.Semaphore(LOCKDOWN_CONCURRENCY)
+        total = len(changes)
+        done = 0
+        failed = 0
+        last_report = time.monotonic()
+        
+        async def report():
+            try:
+                await progress(done, total, failed)
+            except Exception as e:
+                print(f"Error reporting lockdown progress: {e}")
+        
+        async def apply(channel, overwrite):
+            nonlocal done, failed, last_report
+            async with semaphore:
+                try:
+                    await channel.set_permissions(guild.default_role, overwrite=overwrite, reason=reason)
+                    changed = True
+                except Exception:
+                    failed += 1
+                    changed = False
+            done += 1
+            if progress and time.monotonic() - last_report >= LOCKDOWN_PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                await report()
+            return channel.id, changed
+        
+        results = await asyncio.gather(*(apply(channel, overwrite) for channel, overwrite in changes))
+        if progress:
+            await report()
+        return [channel_id for channel_id, changed in results if changed], failed
+    
+    async def initiate_lockdown(self, guild, config, progress=None):
         """Initiate server lockdown"""
         try:
             guild_id = str(guild.id)
             raid_data = self.get_guild_raid_data(guild.id)
             
-            raid_data["lockdown_active"] = True
-            raid_data["lockdown_start"] = datetime.now().isoformat()
-            
-            # Lock all text channels
-            for channel in guild.text_channels:
-                try:
-                    await channel.set_permissions(guild.default_role, send_messages=False)
-                except:
-                    pass
+            async with self.lockdown_locks.setdefault(guild.id, asyncio.Lock()):
+                # A lockdown during a running one keeps the saved settings of the
+                # channels it already closed and only adds the new ones
+                # (None: lockdown from before snapshots were kept, lifted to the role default)
+                previous = raid_data.get("lockdown_snapshot") if raid_data.get("lockdown_active", False) else {}
+                
+                # Remember each channel's own send_messages setting; channels
+                # already closed for @everyone are left alone
+                snapshot = {}
+                changes = []
+                for channel in guild.text_channels:
+                    if previous is not None and str(channel.id) in previous:
+                        continue
+                    overwrite = channel.overwrites_for(guild.default_role)
+                    if overwrite.send_messages is False:
+                        continue
+                    snapshot[str(channel.id)] = overwrite.send_messages
+                    overwrite.send_messages = False
+                    changes.append((channel, overwrite))
+                
+                raid_data["lockdown_active"] = True
+                raid_data["lockdown_start"] = datetime.now().isoformat()
+                # Saved before the first request, so a crash mid-way can still be undone
+                raid_data["lockdown_snapshot"] = None if previous is None else {**previous, **snapshot}
+                self.record_history(raid_data, "lockdown")
+                await self.flush_raid_data(guild.id)
+                
+                changed, failed = await self.apply_overwrites(guild, changes, "AntiRaid: Lockdown", progress)
+                
+                if previous is not None:
+                    raid_data["lockdown_snapshot"] = {**previous, **{str(channel_id): snapshot[str(channel_id)] for channel_id in changed}}
+                await self.flush_raid_data(guild.id)
             
-            await self.log_action(guild, f"🔒 Server lockdown initiated")
-            self.save_raid_data()
+            await self.log_action(guild, f"🔒 Server lockdown initiated ({len(changed)} Kanäle gesperrt, {failed} Fehler)")
+            self.schedule_lockdown_lift(guild.id, config.get("lockdown_duration", 300))
             
         except Exception as e:
             print(f"Error initiating lockdown: {e}")
     
-    async def lift_lockdown(self, guild_id):
+    async def lift_lockdown(self, guild_id, progress=None):
         """Lift server lockdown"""
         try:
             guild = self.bot.get_guild(guild_id)
@@ -300,22 +798,52 @@ class AntiRaid(commands.Cog):
             guild_id_str = str(guild_id)
             raid_data = self.get_guild_raid_data(guild_id)
             
-            raid_data["lockdown_active"] = False
-            raid_data["lockdown_start"] = None
+            timer = self.lockdown_timers.pop(guild_id, None)
+            if timer is not None:
+                timer.cancel()
             
-            # Unlock all text channels
-            for channel in guild.text_channels:
-                try:
-                    await channel.set_permissions(guild.default_role, send_messages=True)
-                except:
-                    pass
+            async with self.lockdown_locks.setdefault(guild_id, asyncio.Lock()):
+                snapshot = raid_data.get("lockdown_snapshot")
+                if snapshot is None:
+                    # Lockdown from before snapshots were kept: back to the role default
+                    snapshot = {str(channel.id): None for channel in guild.text_channels}
+                
+                # Restore the previous value only where the lockdown is still in place
+                changes = []
+                for channel_id, previous in snapshot.items():
+                    channel = guild.get_channel(int(channel_id))
+                    if channel is None:
+                        continue
+                    overwrite = channel.overwrites_for(guild.default_role)
+                    if overwrite.send_messages is not False or previous is False:
+                        continue
+                    overwrite.send_messages = previous
+                    changes.append((channel, None if overwrite.is_empty() else overwrite))
+                
+                changed, failed = await self.apply_overwrites(guild, changes, "AntiRaid: Lockdown lifted", progress)
+                
+                raid_data["lockdown_active"] = False
+                raid_data["lockdown_start"] = None
+                raid_data["lockdown_snapshot"] = None
+                await self.flush_raid_data(guild_id)
             
-            await self.log_action(guild, f"🔓 Server lockdown lifted")
-            self.save_raid_data()
+            await self.log_action(guild, f"🔓 Server lockdown lifted ({len(changed)} Kanäle wiederhergestellt, {failed} Fehler)")
             
         except Exception as e:
             print(f"Error lifting lockdown: {e}")
     
+    def lockdown_progress(self, message, title):
+        """progress callback that edits message with a progress embed"""
+        async def progress(done, total, failed):
+            embed = discord.Embed(
+                title=title,
+                description=f"{done}/{total} Kanäle" + (f" ({failed} Fehler)" if failed else ""),
+                color=discord.Color.orange()
+            )
+            embed.set_footer(text=VANTAX_FOOTER)
+            await message.edit(embed=embed)
+        return progress
+    
     async def apply_verification(self, member, config):
         """Apply verification to new members"""
         try:
@@ -361,6 +889,7 @@ class AntiRaid(commands.Cog):
             guild_id = str(interaction.guild.id)
             config = self.get_guild_config(interaction.guild.id)
             raid_data = self.get_guild_raid_data(interaction.guild.id)
+            history = self.history_totals(raid_data, 24 * 7)
             
             embed = discord.Embed(
                 title="🛡️ AntiRaid Konfiguration",
@@ -371,14 +900,14 @@ class AntiRaid(commands.Cog):
             # Current stats
             embed.add_field(
                 name="📊 Aktuelle Statistik",
-                value=f"Recent Joins: {len(raid_data.get('recent_joins', 0))}\nRaid Detected: {'✅' if raid_data.get('raid_detected', False) else '❌'}\nLockdown: {'✅' if raid_data.get('lockdown_active', False) else '❌'}",
+                value=f"Recent Joins: {self.joins.count(interaction.guild.id, config.get('time_window', 30))}\nRaid Detected: {'✅' if raid_data.get('raid_detected', False) else '❌'}\nLockdown: {'✅' if raid_data.get('lockdown_active', False) else '❌'}\nRaids (7 Tage): {history.get('raid', 0)}\nVerdächtig (7 Tage): {history.get('new_account', 0) + history.get('join_cluster', 0)}",
                 inline=True
             )
             
             # Threshold settings
             embed.add_field(
                 name="⚡ Schwellenwerte",
-                value=f"Join Threshold: {config.get('join_threshold', 5)}\nTime Window: {config.get('time_window', 30)}s\nMin Account Age: {config.get('min_account_age', 86400)//3600}h",
+                value=f"Join Threshold: {config.get('join_threshold', 5)}\nTime Window: {config.get('time_window', 30)}s\nMin Account Age: {config.get('min_account_age', 86400)//3600}h\nCluster Score: {config.get('cluster_threshold', CLUSTER_THRESHOLD):.2f}",
                 inline=True
             )
             
@@ -405,7 +934,7 @@ class AntiRaid(commands.Cog):
             config = self.get_guild_config(interaction.guild.id)
             
             config["enabled"] = not config.get("enabled", False)
-            self.save_antiraid_config()
+            await self.save_antiraid_config(interaction.guild.id)
             
             status = "✅ Aktiviert" if config["enabled"] else "❌ Deaktiviert"
             
@@ -431,7 +960,7 @@ class AntiRaid(commands.Cog):
             config = self.get_guild_config(interaction.guild.id)
             
             config["alert_channel"] = channel.id
-            self.save_antiraid_config()
+            await self.save_antiraid_config(interaction.guild.id)
             
             embed = discord.Embed(
                 title="🚨 AntiRaid Alert-Kanal gesetzt",
@@ -459,7 +988,10 @@ class AntiRaid(commands.Cog):
                 await interaction.response.send_message("❌ Lockdown ist bereits aktiv!", ephemeral=True)
                 return
             
-            await self.initiate_lockdown(interaction.guild, config)
+            # Large servers take longer than the 3s interaction deadline
+            await interaction.response.defer()
+            status = await interaction.followup.send(content="🔒 Lockdown startet...", wait=True)
+            await self.initiate_lockdown(interaction.guild, config, self.lockdown_progress(status, "🔒 Lockdown läuft..."))
             
             embed = discord.Embed(
                 title="🔒 Manuelles Lockdown",
@@ -468,11 +1000,14 @@ class AntiRaid(commands.Cog):
             )
             
             embed.set_footer(text=VANTAX_FOOTER)
-            await interaction.response.send_message(embed=embed)
+            await status.edit(content=None, embed=embed)
             
         except Exception as e:
             print(f"Error in manual lockdown: {e}")
-            await interaction.response.send_message("❌ Ein Fehler ist aufgetreten.", ephemeral=True)
+            if interaction.response.is_done():
+                await interaction.followup.send("❌ Ein Fehler ist aufgetreten.", ephemeral=True)
+            else:
+                await interaction.response.send_message("❌ Ein Fehler ist aufgetreten.", ephemeral=True)
     
     @app_commands.command(name="unlockdown", description="Hebe Server-Lockdown auf")
     @app_commands.checks.has_permissions(manage_guild=True)
@@ -486,7 +1021,9 @@ class AntiRaid(commands.Cog):
                 await interaction.response.send_message("❌ Kein aktives Lockdown!", ephemeral=True)
                 return
             
-            await self.lift_lockdown(interaction.guild.id)
+            await interaction.response.defer()
+            status = await interaction.followup.send(content="🔓 Lockdown wird aufgehoben...", wait=True)
+            await self.lift_lockdown(interaction.guild.id, self.lockdown_progress(status, "🔓 Kanäle werden wiederhergestellt..."))
             
             embed = discord.Embed(
                 title="🔓 Lockdown aufgehoben",
@@ -495,11 +1032,14 @@ class AntiRaid(commands.Cog):
             )
             
             embed.set_footer(text=VANTAX_FOOTER)
-            await interaction.response.send_message(embed=embed)
+            await status.edit(content=None, embed=embed)
             
         except Exception as e:
             print(f"Error in manual unlockdown: {e}")
-            await interaction.response.send_message("❌ Ein Fehler ist aufgetreten.", ephemeral=True)
+            if interaction.response.is_done():
+                await interaction.followup.send("❌ Ein Fehler ist aufgetreten.", ephemeral=True)
+            else:
+                await interaction.response.send_message("❌ Ein Fehler ist aufgetreten.", ephemeral=True)
 
 async def setup(bot):
     try:
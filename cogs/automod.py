@@ -2,25 +2,1218 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import json
+import operator
 import os
 import re
+import shutil
+import string
 import asyncio
+import tempfile
+import time
+import unicodedata
+from collections import deque
+from urllib.parse import urlsplit
 from datetime import datetime, timedelta
 
 # Constants
 VANTAX_COLOR = discord.Color.blurple()
 VANTAX_FOOTER = "VANTAX Discord Bot by Maurice"
 
+# Banned word matching modes
+WORD_MODE_SUBSTRING = "substring"
+WORD_MODE_WHOLE = "word"
+# Below this many words a plain substring loop (C-level str.__contains__) beats the automaton
+AUTOMATON_MIN_WORDS = 128
+
+# Precompiled once instead of on every check; invites are matched against lowercased content
+INVITE_PATTERN = re.compile(r'(discord\.gg/|discord\.com/invite/|discordapp\.com/invite/)[\w-]+')
+URL_PATTERN = re.compile(r'https?://[^\s]+', re.IGNORECASE)
+# Leading run of characters that can be part of a host name
+HOST_PATTERN = re.compile(r'[\w.:-]+')
+ASCII_UPPERCASE = string.ascii_uppercase.encode("ascii")
+
+# Normalization before rule evaluation: invisible characters, combining marks,
+# look-alike letters from other scripts, and leetspeak
+INVISIBLE_CHARS = (
+    [0x00AD, 0x034F, 0x061C, 0x115F, 0x1160, 0x17B4, 0x17B5, 0x180E, 0x3164, 0xFEFF, 0xFFA0]
+    + list(range(0x200B, 0x2010)) + list(range(0x202A, 0x202F)) + list(range(0x2060, 0x2070))
+)
+COMBINING_RANGES = ((0x0300, 0x0370), (0x1AB0, 0x1B00), (0x1DC0, 0x1E00), (0x20D0, 0x2100), (0xFE20, 0xFE30))
+CONFUSABLES = {
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "ё": "e", "з": "3", "і": "i", "ї": "i", "ј": "j", "к": "k", "м": "m",
+    "н": "h", "о": "o", "п": "n", "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "ѕ": "s", "ԁ": "d",
+    "ԛ": "q", "ԝ": "w", "ү": "y", "һ": "h", "ӏ": "l",
+    # Greek
+    "α": "a", "β": "b", "γ": "y", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p",
+    "τ": "t", "υ": "u", "χ": "x", "ω": "w",
+    # Latin look-alikes
+    "ı": "i", "ȷ": "j", "ɑ": "a", "ɡ": "g", "ɩ": "i", "ʀ": "r", "ʏ": "y", "ᴀ": "a", "ᴄ": "c", "ᴅ": "d",
+    "ᴇ": "e", "ᴋ": "k", "ᴍ": "m", "ᴏ": "o", "ᴘ": "p", "ᴛ": "t", "ᴜ": "u", "ᴠ": "v", "ᴡ": "w", "ᴢ": "z",
+    "ø": "o", "đ": "d", "ħ": "h", "ł": "l", "ŧ": "t"
+}
+LEETSPEAK = {"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s"}
+# str.translate is much slower on characters missing from the table, so the
+# common scripts map to themselves explicitly
+FOLD_TABLE = str.maketrans({
+    **{chr(code): chr(code) for code in range(0x3000)},
+    **{chr(code): None for code in INVISIBLE_CHARS},
+    **{chr(code): None for start, end in COMBINING_RANGES for code in range(start, end)},
+    **CONFUSABLES
+})
+LEET_TABLE = str.maketrans(LEETSPEAK)
+# Words holding a leetspeak character, and the runs of such characters in them.
+# A run is mapped only inside a word of letters (h3ll0, 1d10t), so numbers
+# (455, x1337), e-mail addresses and URLs keep their digits and symbols
+LEET_WORD_PATTERN = re.compile(r"\S*[" + re.escape("".join(LEETSPEAK)) + r"]\S*")
+LEET_RUN_PATTERN = re.compile(r"([" + re.escape("".join(LEETSPEAK)) + r"]+)")
+EMAIL_OR_URL_PATTERN = re.compile(r"://|^www\.|@[^@]*\w\.\w")
+
+# Message-rate buffers untouched for this long (or the largest time_window, if longer) are dropped
+SPAM_IDLE_SECONDS = 300
+SPAM_SWEEP_INTERVAL = 60
+
+# Violations older than this are pruned when the journal is compacted
+VIOLATION_RETENTION_DAYS = int(os.getenv("AUTOMOD_VIOLATION_RETENTION_DAYS", "30"))
+# Compact once the journal has this many lines, or after this many seconds
+VIOLATION_COMPACT_LINES = 5000
+VIOLATION_COMPACT_INTERVAL = 600
+
+# Near-duplicate floods: SimHash fingerprints at most this many bits apart count as the same text
+FLOOD_MAX_DISTANCE = 14
+# Fingerprints kept per guild, however long the time window is
+FLOOD_MAX_ENTRIES = 1000
+FLOOD_TOKEN_PATTERN = re.compile(r'[^\W\d_]+')
+
+# Punishments: deletions and DMs are collected for this many seconds, then sent in bulk
+PUNISH_WINDOW = 1.0
+# channel.delete_messages takes at most 100 messages
+BULK_DELETE_LIMIT = 100
+# Concurrent DMs, kicks and bans
+PUNISH_CONCURRENCY = 4
+
+# Log channel digests: violations wait at most this many seconds before they are posted
+LOG_DIGEST_WINDOW = 5.0
+# Discord limits per message
+LOG_EMBEDS_PER_MESSAGE = 10
+LOG_EMBED_CHARS_PER_MESSAGE = 6000
+
+# Link protection modes: flag everything not allowed, or only known-bad domains
+LINK_MODE_ALLOWLIST = "allowlist"
+LINK_MODE_BLOCKLIST = "blocklist"
+# Shared list of known-bad domains, one per line ("#" comments and hosts-file lines work)
+LINK_BLOCKLIST_FILE = os.getenv("AUTOMOD_BLOCKLIST_FILE", "blocked_domains.txt")
+
+def _is_word_char(char):
+    return char.isalnum() or char == "_"
+
+def normalize_host(host):
+    """Lowercase, IDNA-encoded host name without trailing dot, or None"""
+    match = HOST_PATTERN.match(host.strip().lower())
+    if not match:
+        return None
+    host = match.group().strip(".")
+    if not host.isascii():
+        try:
+            host = host.encode("idna").decode("ascii")
+        except UnicodeError:
+            pass
+    return host or None
+
+def url_host(url):
+    """Host of a URL (ignoring user info and port), normalized, or None"""
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        return None
+    return normalize_host(host) if host else None
+
+class DomainTrie:
+    """Domain names stored by reversed labels: "www.youtube.com" -> com, youtube, www.
+
+    A plain entry matches the domain itself and every subdomain,
+    "*.example.com" only its subdomains. Labels are compared whole, so
+    "evil-youtube.com" does not match "youtube.com", and a lookup visits
+    at most one node per label of the host however many domains are stored.
+    """
+
+    # Node keys that can never be a label after normalize_host
+    _SELF = ""
+    _SUBDOMAINS = "*"
+
+    def __init__(self, domains=()):
+        self._root = {}
+        self.size = 0
+        for domain in domains:
+            self.add(domain)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, domain):
+        domain = domain.strip()
+        domain = domain.strip()
+        wildcard = domain.startswith("*.")
+        entry = domain[2:] if wildcard else domain
+        if "://" in entry or entry.count(":") == 1:
+            # Written as a URL or with a port ("https://example.com", "example.com:8080")
+            host = url_host(entry if "://" in entry else "//" + entry)
+        else:
+            host = normalize_host(entry)
+        if host is None:
+            return False
+        node = self._root
+        for label in reversed(host.split(".")):
+            if label:
+                node = node.setdefault(label, {})
+        flag = self._SUBDOMAINS if wildcard else self._SELF
+        if flag in node:
+            return False
+        node[flag] = domain
+        self.size += 1
+        return True
+
+    def match(self, host):
+        """The entry covering host, or None"""
+        labels = host.split(".")
+        node = self._root
+        for remaining in range(len(labels) - 1, -1, -1):
+            node = node.get(labels[remaining])
+            if node is None:
+                return None
+            entry = node.get(self._SELF)
+            if entry is None and remaining:
+                entry = node.get(self._SUBDOMAINS)
+            if entry is not None:
+                return entry
+        return None
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a blocklist file; plain domains per line or "0.0.0.0 domain" hosts lines"""
+        trie = cls()
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                line = line.split("#", 1)[0].split()
+                if line:
+                    trie.add(line[-1])
+        return trie
+
+def fold_text(text):
+    """Lowercase text with compatibility forms (NFKD), invisible characters,
+    combining marks and look-alike letters folded to plain Latin"""
+    if text.isascii():
+        return text.lower()
+    return unicodedata.normalize("NFKD", text).lower().translate(FOLD_TABLE)
+
+def normalize_text(text):
+    """fold_text plus leetspeak digits and symbols mapped to letters in words that have letters"""
+    return _leet(fold_text(text))
+
+def _leet(text):
+    return LEET_WORD_PATTERN.sub(_leet_word, text)
+
+def _leet_word(match):
+    word = match.group()
+    letters = sum(char.isalpha() for char in word)
+    if not letters or EMAIL_OR_URL_PATTERN.search(word):
+        return word
+
+    # parts alternates between text and leetspeak runs: [text, run, text, ..., text]
+    parts = LEET_RUN_PATTERN.split(word)
+    for i in range(1, len(parts), 2):
+        before, run, after = parts[i - 1], parts[i], parts[i + 1]
+        letter_before = before[-1:].isalpha()
+        letter_after = after[:1].isalpha()
+        if letter_before and letter_after:
+            parts[i] = run.translate(LEET_TABLE)
+        elif (letter_before and not after or letter_after and not before) and len(run) < letters:
+            # At the start or end of a word only if the word is mostly letters
+            parts[i] = run.translate(LEET_TABLE)
+    return "".join(parts)
+
+# _SIMHASH_SPREAD[b] puts bit i of byte b into its own 16-bit field, so summing
+# spread bytes counts eight bit positions at once
+_SIMHASH_FIELD = 16
+_SIMHASH_SPREAD = [
+    sum(1 << (i * _SIMHASH_FIELD) for i in range(8) if byte >> i & 1)
+    for byte in range(256)
+]
+
+def simhash(text):
+    """64-bit SimHash over the words of lowercased text, or None without words.
+
+    Digits are ignored, so "free nitro 123" and "free nitro 456" collide.
+    Uses the process-local hash(), so fingerprints are not comparable
+    across restarts.
+    """
+    words = FLOOD_TOKEN_PATTERN.findall(text)
+    if not words:
+        return None
+    raw = b"".join((hash(word) & 0xFFFFFFFFFFFFFFFF).to_bytes(8, "little") for word in words)
+    half = len(words) / 2
+    field_mask = (1 << _SIMHASH_FIELD) - 1
+    fingerprint = 0
+    for byte_index in range(8):
+        counts = sum(map(_SIMHASH_SPREAD.__getitem__, raw[byte_index::8]))
+        for bit in range(8):
+            if (counts >> (bit * _SIMHASH_FIELD)) & field_mask > half:
+                fingerprint |= 1 << (byte_index * 8 + bit)
+    return fingerprint
+
+class BannedWordMatcher:
+    """Aho-Corasick automaton over one guild's banned words.
+
+    Built once whenever the word list changes; find() walks the message a
+    single time no matter how many words are banned. In whole-word mode a
+    hit only counts if it is not surrounded by letters, digits or "_".
+    Short substring lists skip the automaton, see AUTOMATON_MIN_WORDS.
+    """
+
+    def __init__(self, words, mode=WORD_MODE_SUBSTRING, min_words=AUTOMATON_MIN_WORDS):
+        self.mode = mode
+        # Words go through the same normalization as the messages they are matched against
+        self.words = sorted({word for word in map(normalize_text, words) if word})
+        self.linear = mode == WORD_MODE_SUBSTRING and len(self.words) < min_words
+        if self.linear:
+            return
+
+        # Trie (goto), failure links and the words ending in each state
+        goto = [{}]
+        outputs = [()]
+        for index, word in enumerate(self.words):
+            state = 0
+            for char in word:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append(())
+                state = next_state
+            outputs[state] += (index,)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                outputs[next_state] += outputs[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+
+    def __len__(self):
+        return len(self.words)
+
+    def find(self, text):
+        """First banned word in text (case-insensitive), or None"""
+        text = text.lower()
+        if self.linear:
+            return next((word for word in self.words if word in text), None)
+
+        goto, fail, outputs, words = self._goto, self._fail, self._outputs, self.words
+        whole_word = self.mode == WORD_MODE_WHOLE
+        state = 0
+        for end, char in enumerate(text, start=1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                for index in outputs[state]:
+                    word = words[index]
+                    if not whole_word:
+                        return word
+                    start = end - len(word)
+                    if (start == 0 or not _is_word_char(text[start - 1])) and (end == len(text) or not _is_word_char(text[end])):
+                        return word
+        return None
+
+class MessageFeatures:
+    """Everything the rule checks need from one message, computed once.
+
+    Cheap substring tests gate the regexes, so most messages never run
+    one, and caps are counted by deleting A-Z with bytes.translate
+    (non-ASCII text falls back to str.isupper per character). The folded
+    and normalized texts are only built when a rule asks for them.
+    """
+
+    __slots__ = ("content", "lower", "length", "caps", "mentions", "urls", "domains", "has_invite", "_folded", "_normalized")
+
+    def __init__(self, content, mentions=0):
+        self.content = content
+        self.lower = content.lower()
+        self.length = len(content)
+        if content.isascii():
+            self.caps = self.length - len(content.encode("ascii").translate(None, ASCII_UPPERCASE))
+        else:
+            self.caps = sum(map(str.isupper, content))
+        self.mentions = mentions
+        self.urls = URL_PATTERN.findall(content) if "://" in content else []
+        self.domains = [host for host in map(url_host, self.urls) if host]
+        self.has_invite = "discord" in self.lower and INVITE_PATTERN.search(self.lower) is not None
+        self._folded = None
+        self._normalized = None
+
+    @classmethod
+    def from_message(cls, message):
+        return cls(message.content, len(message.mentions))
+
+    @property
+    def folded(self):
+        """fold_text of the content, computed on first use"""
+        if self._folded is None:
+            self._folded = fold_text(self.content)
+        return self._folded
+
+    @property
+    def normalized(self):
+        """normalize_text of the content, computed on first use"""
+        if self._normalized is None:
+            self._normalized = _leet(self.folded)
+        return self._normalized
+
+    @property
+    def caps_percentage(self):
+        return (self.caps / self.length) * 100 if self.length else 0.0
+
+class MessageRateTracker:
+    """Recent message times per (guild, user) as time.monotonic() floats.
+
+    Each buffer is trimmed to the time window and to max_messages + 1
+    entries on every hit, so the rate check is O(1) amortized. Buffers of
+    users who went quiet are dropped by expire().
+    """
+
+    def __init__(self):
+        self._buffers = {}
+
+    def __len__(self):
+        return len(self._buffers)
+
+    def hit(self, key, now, max_messages, time_window):
+        """Record a message and return how many fall inside the window (at most max_messages + 1)"""
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = deque()
+        cutoff = now - time_window
+        while buffer and buffer[0] <= cutoff:
+            buffer.popleft()
+        buffer.append(now)
+        while len(buffer) > max_messages + 1:
+            buffer.popleft()
+        return len(buffer)
+
+    def expire(self, idle, now=None):
+        """Drop every buffer whose newest message is older than idle seconds"""
+        cutoff = (time.monotonic() if now is None else now) - idle
+        stale = [key for key, buffer in self._buffers.items() if not buffer or buffer[-1] <= cutoff]
+        for key in stale:
+            del self._buffers[key]
+        return len(stale)
+
+class ViolationJournal:
+    """automod_violations.json as a snapshot plus an append-only JSONL journal.
+
+    add() writes one journal line instead of rewriting the whole file.
+    compact() prunes entries past the retention, writes a fresh snapshot
+    and starts an empty journal. Counts per (user, guild) are kept in
+    memory, so nobody has to take len() of a list.
+    """
+
+    def __init__(self, path, retention_days=VIOLATION_RETENTION_DAYS):
+        self.path = path
+        self.journal_path = os.path.splitext(path)[0] + ".jsonl"
+        self.retention = timedelta(days=retention_days)
+        self.violations = {}
+        self.counts = {}
+        self.journal_lines = 0
+        self.last_compact = time.monotonic()
+        self._journal = None
+        self.load()
+
+    def load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.violations = json.load(f)
+        except Exception as e:
+            print(f"Error loading violations: {e}")
+            self.violations = {}
+
+        # A leftover .old journal means a compaction was interrupted; its
+        # lines may or may not have reached the snapshot already
+        old_path = self.journal_path + ".old"
+        interrupted = os.path.exists(old_path)
+        if interrupted:
+            seen = {
+                (uid, gid, entry.get("type"), entry.get("timestamp"))
+                for uid, guilds in self.violations.items()
+                for gid, entries in guilds.items()
+                for entry in entries
+            }
+            self._replay(old_path, seen)
+        self.journal_lines = self._replay(self.journal_path)
+        self.prune()
+
+        if interrupted:
+            self._write_snapshot(self._copy())
+            open(self.journal_path, 'w').close()
+            os.remove(old_path)
+            self.journal_lines = 0
+        self._journal = open(self.journal_path, 'a', encoding='utf-8', buffering=1)
+
+    def _replay(self, path, seen=None):
+        if not os.path.exists(path):
+            return 0
+        lines = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    uid, gid = record["user_id"], record["guild_id"]
+                    entry = {"type": record["type"], "timestamp": record["timestamp"]}
+                except (ValueError, KeyError, TypeError):
+                    # Torn last line from a crash
+                    continue
+                lines += 1
+                if seen is not None and (uid, gid, entry["type"], entry["timestamp"]) in seen:
+                    continue
+                self.violations.setdefault(uid, {}).setdefault(gid, []).append(entry)
+        return lines
+
+    def add(self, user_id, guild_id, violation_type):
+        """Record a violation and return the user's count in that guild"""
+        user_id_str = str(user_id)
+        guild_id_str = str(guild_id)
+        entry = {"type": violation_type, "timestamp": datetime.now().isoformat()}
+        self.violations.setdefault(user_id_str, {}).setdefault(guild_id_str, []).append(entry)
+        key = (user_id_str, guild_id_str)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        try:
+            self._journal.write(json.dumps({"user_id": user_id_str, "guild_id": guild_id_str, **entry}, ensure_ascii=False) + "\n")
+            self.journal_lines += 1
+        except Exception as e:
+            print(f"Error writing violation journal: {e}")
+        return self.counts[key]
+
+    def count(self, user_id, guild_id):
+        return self.counts.get((str(user_id), str(guild_id)), 0)
+
+    def prune(self):
+        """Drop entries older than the retention and rebuild the counters"""
+        cutoff = (datetime.now() - self.retention).isoformat()
+        pruned = 0
+        counts = {}
+        for uid in list(self.violations):
+            guilds = self.violations[uid]
+            for gid in list(guilds):
+                # ISO timestamps from datetime.now() sort chronologically as strings
+                kept = [entry for entry in guilds[gid] if entry.get("timestamp", "") >= cutoff]
+                pruned += len(guilds[gid]) - len(kept)
+                if kept:
+                    guilds[gid] = kept
+                    counts[(uid, gid)] = len(kept)
+                else:
+                    del guilds[gid]
+            if not guilds:
+                del self.violations[uid]
+        self.counts = counts
+        return pruned
+
+    def needs_compaction(self):
+        if self.journal_lines >= VIOLATION_COMPACT_LINES:
+            return True
+        return self.journal_lines > 0 and time.monotonic() - self.last_compact >= VIOLATION_COMPACT_INTERVAL
+
+    def _copy(self):
+        return {uid: {gid: list(entries) for gid, entries in guilds.items()} for uid, guilds in self.violations.items()}
+
+    def _write_snapshot(self, snapshot):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".automod_violations-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    async def compact(self):
+        """Prune, switch to a fresh journal and write the snapshot off the event loop"""
+        self.prune()
+        old_path = self.journal_path + ".old"
+        self._journal.close()
+        if os.path.exists(old_path):
+            # The previous snapshot write failed; keep those lines until this one lands
+            with open(self.journal_path, 'r', encoding='utf-8') as src, open(old_path, 'a', encoding='utf-8') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, old_path)
+        self._journal = open(self.journal_path, 'a', encoding='utf-8', buffering=1)
+        self.journal_lines = 0
+        self.last_compact = time.monotonic()
+
+        snapshot = self._copy()
+        await asyncio.to_thread(self._write_snapshot, snapshot)
+        os.remove(old_path)
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+class FloodDetector:
+    """Recent message fingerprints per guild, for spotting near-identical floods.
+
+    Each guild keeps a deque of [time, fingerprint, message, punished]
+    entries, oldest first, trimmed to the time window and to max_entries,
+    so memory is bounded by the window. add() returns every entry within
+    max_distance bits of the new fingerprint, across all users and channels.
+    """
+
+    def __init__(self, max_distance=FLOOD_MAX_DISTANCE, max_entries=FLOOD_MAX_ENTRIES):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._windows = {}
+        self._time_windows = {}
+
+    def __len__(self):
+        return sum(len(window) for window in self._windows.values())
+
+    def add(self, guild_id, fingerprint, message, now, time_window):
+        window = self._windows.get(guild_id)
+        if window is None:
+            window = self._windows[guild_id] = deque()
+        self._time_windows[guild_id] = time_window
+        cutoff = now - time_window
+        while window and window[0][0] <= cutoff:
+            window.popleft()
+
+        max_distance = self.max_distance
+        cluster = [entry for entry in window if (entry[1] ^ fingerprint).bit_count() <= max_distance]
+        entry = [now, fingerprint, message, False]
+        window.append(entry)
+        cluster.append(entry)
+        if len(window) > self.max_entries:
+            window.popleft()
+        return cluster
+
+    def expire(self, now=None):
+        """Trim every guild to its window and forget guilds that went quiet"""
+        now = time.monotonic() if now is None else now
+        for guild_id in list(self._windows):
+            window = self._windows[guild_id]
+            cutoff = now - self._time_windows[guild_id]
+            while window and window[0][0] <= cutoff:
+                window.popleft()
+            if not window:
+                del self._windows[guild_id]
+                del self._time_windows[guild_id]
+
+class PunishmentExecutor:
+    """Batches automod punishments instead of one REST call per violation.
+
+    Deletions are collected per channel and removed with
+    channel.delete_messages, BULK_DELETE_LIMIT at a time. DM notices are
+    merged into one DM per user per window. Kicks and bans start right
+    away but share a semaphore with the DMs, and a member already being
+    removed is not removed twice.
+    """
+
+    def __init__(self, window=PUNISH_WINDOW, concurrency=PUNISH_CONCURRENCY):
+        self.window = window
+        self._deletions = {}
+        self._notices = {}
+        self._removals = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pending = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task = None
+
+        # Counters
+        self.deleted = 0
+        self.bulk_calls = 0
+        self.dms_sent = 0
+        self.notices_merged = 0
+        self.removed = 0
+        self.failed = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def delete(self, message):
+        channel_messages = self._deletions.get(message.channel.id)
+        if channel_messages is None:
+            channel_messages = self._deletions[message.channel.id] = (message.channel, {})
+        channel_messages[1][message.id] = message
+        self._pending.set()
+        if len(channel_messages[1]) >= BULK_DELETE_LIMIT:
+            self._full.set()
+
+    def notify(self, user, text):
+        notice = self._notices.get(user.id)
+        if notice is None:
+            self._notices[user.id] = (user, [text])
+        else:
+            notice[1].append(text)
+            self.notices_merged += 1
+        self._pending.set()
+
+    def remove(self, guild, member, action, reason):
+        """Kick or ban in the background; returns False if the member is already being removed"""
+        key = (guild.id, member.id)
+        if key in self._removals:
+            return False
+        self._removals[key] = asyncio.create_task(self._remove(key, guild, member, action, reason))
+        return True
+
+    async def _remove(self, key, guild, member, action, reason):
+        try:
+            async with self._semaphore:
+                if action == "ban":
+                    await guild.ban(member, reason=reason)
+                else:
+                    await guild.kick(member, reason=reason)
+            self.removed += 1
+        except Exception:
+            self.failed += 1
+        finally:
+            self._removals.pop(key, None)
+
+    async def _run(self):
+        while True:
+            await self._pending.wait()
+            # Let the window fill up, unless a channel already has a full batch
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.window)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error running automod punishments: {e}")
+
+    async def flush(self):
+        deletions, self._deletions = self._deletions, {}
+        notices, self._notices = self._notices, {}
+        self._pending.clear()
+        self._full.clear()
+        await asyncio.gather(
+            *(self._bulk_delete(channel, list(messages.values())) for channel, messages in deletions.values()),
+            *(self._send_notice(user, lines) for user, lines in notices.values())
+        )
+
+    async def _bulk_delete(self, channel, messages):
+        for start in range(0, len(messages), BULK_DELETE_LIMIT):
+            chunk = messages[start:start + BULK_DELETE_LIMIT]
+            if len(chunk) > 1 and hasattr(channel, "delete_messages"):
+                try:
+                    await channel.delete_messages(chunk)
+                    self.bulk_calls += 1
+                    self.deleted += len(chunk)
+                    continue
+                except Exception:
+                    # e.g. one of them is already gone; delete one by one instead
+                    pass
+            for message in chunk:
+                try:
+                    await message.delete()
+                    self.deleted += 1
+                except Exception:
+                    self.failed += 1
+
+    async def _send_notice(self, user, lines):
+        # Same reason several times in one window becomes one line with a count
+        counts = {}
+        for line in lines:
+            counts[line] = counts.get(line, 0) + 1
+        text = "\n".join(line if count == 1 else f"{line} ({count}x)" for line, count in counts.items())
+        try:
+            async with self._semaphore:
+                await user.send(text[:2000])
+            self.dms_sent += 1
+        except Exception:
+            self.failed += 1
+
+    async def close(self):
+        """Send whatever is still queued and wait for running kicks and bans"""
+        if self._task is not None:
+            self._task.cancel()
+        await self.flush()
+        if self._removals:
+            await asyncio.gather(*self._removals.values(), return_exceptions=True)
+
+    def stats(self):
+        return {
+            "pending_deletions": sum(len(messages) for _, messages in self._deletions.values()),
+            "pending_notices": len(self._notices),
+            "running_removals": len(self._removals),
+            "deleted": self.deleted,
+            "bulk_calls": self.bulk_calls,
+            "dms_sent": self.dms_sent,
+            "notices_merged": self.notices_merged,
+            "removed": self.removed,
+            "failed": self.failed
+        }
+
+def _clip(text, limit):
+    return text[:limit] + "..." if len(text) > limit else text
+
+def violation_embed(entries):
+    """One log embed for a user's violations of one type; a single entry looks like the classic log"""
+    last = entries[-1]
+    if len(entries) == 1:
+        embed = discord.Embed(
+            title="🛡️ AutoMod Violation",
+            description=f"**User:** {last['user']}\n**Violation:** {last['type']}\n**Reason:** {last['reason']}\n**Punishment:** {last['punishment']}\n**Count:** {last['count']}",
+            color=discord.Color.red()
+        )
+        embed.add_field(name="Message Content", value=_clip(last["content"], 500) or "-", inline=False)
+        embed.add_field(name="Channel", value=last["channel"], inline=True)
+        embed.add_field(name="Time", value=last["time"], inline=True)
+    else:
+        punishments = ", ".join(dict.fromkeys(entry["punishment"] for entry in entries))
+        embed = discord.Embed(
+            title=f"🛡️ AutoMod Violation ×{len(entries)}",
+            description=f"**User:** {last['user']}\n**Violation:** {last['type']}\n**Reason:** {last['reason']}\n**Punishment:** {punishments}\n**Count:** {last['count']}",
+            color=discord.Color.red()
+        )
+        # The newest few messages are enough to see what happened
+        recent = entries[-3:]
+        embed.add_field(
+            name=f"Message Content (last {len(recent)})",
+            value="\n".join(f"• {_clip(entry['content'], 150) or '-'}" for entry in recent),
+            inline=False
+        )
+        embed.add_field(name="Channel", value=" ".join(dict.fromkeys(entry["channel"] for entry in entries))[:1024], inline=True)
+        embed.add_field(name="Time", value=f"{entries[0]['time']} – {last['time'][-8:]}", inline=True)
+    embed.set_thumbnail(url=last["avatar"])
+    embed.set_footer(text=VANTAX_FOOTER)
+    return embed
+
+class LogDigest:
+    """Violations buffered per log channel and posted as grouped digests.
+
+    The first violation in an empty buffer starts a LOG_DIGEST_WINDOW
+    timer, which bounds how late anything is logged. When it fires, the
+    buffer is grouped by (user, violation type) into one embed per group,
+    and the embeds are packed into as few messages as Discord allows.
+    Kicks and bans flush the channel right away.
+    """
+
+    def __init__(self, window=LOG_DIGEST_WINDOW):
+        self.window = window
+        self._buffers = {}
+        self._timers = {}
+        self._sending = set()
+
+        # Counters
+        self.logged = 0
+        self.messages_sent = 0
+
+    def add(self, channel, entry, urgent=False):
+        buffer = self._buffers.get(channel.id)
+        if buffer is None:
+            buffer = self._buffers[channel.id] = (channel, [])
+        buffer[1].append(entry)
+        self.logged += 1
+
+        if urgent:
+            timer = self._timers.pop(channel.id, None)
+            if timer is not None:
+                timer.cancel()
+            task = asyncio.create_task(self._send(channel.id))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+        elif channel.id not in self._timers:
+            self._timers[channel.id] = asyncio.create_task(self._send_later(channel.id))
+
+    async def _send_later(self, channel_id):
+        await asyncio.sleep(self.window)
+        self._timers.pop(channel_id, None)
+        await self._send(channel_id)
+
+    async def _send(self, channel_id):
+        buffer = self._buffers.pop(channel_id, None)
+        if buffer is None:
+            return
+        channel, entries = buffer
+
+        groups = {}
+        for entry in entries:
+            groups.setdefault((entry["user_id"], entry["type"]), []).append(entry)
+
+        batch = []
+        size = 0
+        try:
+            for group in groups.values():
+                embed = violation_embed(group)
+                if batch and (len(batch) >= LOG_EMBEDS_PER_MESSAGE or size + len(embed) > LOG_EMBED_CHARS_PER_MESSAGE):
+                    await channel.send(embeds=batch)
+                    self.messages_sent += 1
+                    batch, size = [], 0
+                batch.append(embed)
+                size += len(embed)
+            if batch:
+                await channel.send(embeds=batch)
+                self.messages_sent += 1
+        except Exception as e:
+            print(f"Error logging violation: {e}")
+
+    async def close(self):
+        """Post everything that is still buffered"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        await asyncio.gather(*(self._send(channel_id) for channel_id in list(self._buffers)), *self._sending)
+
+# Custom rules live in the guild's "rules" list in automod_config.json, e.g.
+#   {"name": "no-pings", "conditions": {"content": {"matches": "@(everyone|here)"}, "length": {"<": 200}},
+#    "exempt_channels": [123], "exempt_roles": [456], "action": "warn", "reason": "No pings ({length} chars)"}
+# A bare value in "conditions" means "==". "exempt_channels"/"exempt_roles" on the guild apply to every rule.
+# Rule engine: what each action does to the message, and the actions after
+# which the message is gone, so the remaining rules are skipped
+RULE_ACTIONS = ("delete", "warn", "kick", "ban", "log")
+TERMINAL_ACTIONS = ("delete", "kick", "ban")
+# Features that record the message (rate windows, flood index); their rules
+# still run after a terminal action so every message is counted
+STATEFUL_FEATURES = frozenset({"message_rate", "flood_size"})
+
+def _blocked_domain(ctx):
+    allowed = ctx.cog.get_domain_allowlist(ctx.message.guild.id, ctx.config.get("link_protection", {}))
+    blocklist = ctx.cog.domain_blocklist
+    return next((domain for domain in ctx.features.domains if allowed.match(domain) is None and blocklist.match(domain) is not None), None)
+
+def _unlisted_domain(ctx):
+    allowed = ctx.cog.get_domain_allowlist(ctx.message.guild.id, ctx.config.get("link_protection", {}))
+    blocklist = ctx.cog.domain_blocklist
+    return next((domain for domain in ctx.features.domains if allowed.match(domain) is None and blocklist.match(domain) is None), None)
+
+def _message_rate(ctx):
+    # Counted in the spam_protection window, up to what the guild's rules compare against
+    spam_config = ctx.config.get("spam_protection", {})
+    cap = max(spam_config.get("max_messages", 5) + 1, ctx.cog.rate_caps.get(str(ctx.message.guild.id), 0))
+    key = (ctx.message.guild.id, ctx.message.author.id)
+    return ctx.cog.message_rates.hit(key, time.monotonic(), cap - 1, spam_config.get("time_window", 10))
+
+def _banned_word(ctx):
+    return ctx.cog.get_word_matcher(ctx.message.guild.id, ctx.config).find(ctx.features.normalized)
+
+def _flood_size(ctx):
+    fingerprint = simhash(ctx.features.folded)
+    if fingerprint is None:
+        return 0
+    flood_config = ctx.config.get("flood_protection", {})
+    ctx.cluster = ctx.cog.floods.add(ctx.message.guild.id, fingerprint, ctx.message, time.monotonic(), flood_config.get("time_window", 30))
+    return len(ctx.cluster)
+
+# Feature name -> (relative cost, getter); rules run cheapest-first by the costs of their conditions
+RULE_FEATURES = {
+    "length": (0, lambda ctx: ctx.features.length),
+    "lines": (0, lambda ctx: ctx.features.content.count("\n") + 1),
+    "caps": (0, lambda ctx: ctx.features.caps),
+    "caps_percentage": (0, lambda ctx: ctx.features.caps_percentage),
+    "mentions": (0, lambda ctx: ctx.features.mentions),
+    "role_mentions": (0, lambda ctx: len(ctx.message.role_mentions)),
+    "mention_everyone": (0, lambda ctx: ctx.message.mention_everyone),
+    "attachments": (0, lambda ctx: len(ctx.message.attachments)),
+    "has_invite": (0, lambda ctx: ctx.features.has_invite),
+    "url_count": (0, lambda ctx: len(ctx.features.urls)),
+    "domains": (0, lambda ctx: ctx.features.domains),
+    # Lowercased; "normalized" also folds look-alikes and leetspeak
+    "content": (0, lambda ctx: ctx.features.lower),
+    "normalized": (1, lambda ctx: ctx.features.normalized),
+    "blocked_domain": (1, _blocked_domain),
+    "unlisted_domain": (1, _unlisted_domain),
+    "message_rate": (2, _message_rate),
+    "banned_word": (3, _banned_word),
+    "flood_size": (4, _flood_size)
+}
+
+RULE_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "in": lambda value, operand: value in operand,
+    "not_in": lambda value, operand: value not in operand,
+    "contains": lambda value, operand: value is not None and operand in value
+}
+
+class RuleContext:
+    """One message on its way through the rules; every feature is computed at most once"""
+
+    __slots__ = ("cog", "message", "config", "features", "values", "cluster")
+
+    def __init__(self, cog, message, config, features):
+        self.cog = cog
+        self.message = message
+        self.config = config
+        self.features = features
+        self.values = {}
+        self.cluster = None
+
+    def get(self, name):
+        try:
+            return self.values[name]
+        except KeyError:
+            value = self.values[name] = RULE_FEATURES[name][1](self)
+            return value
+
+class _ReasonValues:
+    """format_map() mapping that pulls features out of a RuleContext"""
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+
+    def __getitem__(self, name):
+        return self.ctx.get(name)
+
+def _compile_condition(feature, spec):
+    if feature not in RULE_FEATURES:
+        raise ValueError(f"unknown feature '{feature}'")
+    if not isinstance(spec, dict):
+        spec = {"==": spec}
+
+    tests = []
+    for op, operand in spec.items():
+        if op == "matches":
+            search = re.compile(operand, re.IGNORECASE).search
+            tests.append(lambda value, search=search: value is not None and search(str(value)) is not None)
+            continue
+        func = RULE_OPERATORS.get(op)
+        if func is None:
+            raise ValueError(f"unknown operator '{op}'")
+        if op in ("in", "not_in") and isinstance(operand, list):
+            operand = frozenset(operand)
+        tests.append(lambda value, func=func, operand=operand: func(value, operand))
+
+    def condition(ctx):
+        value = ctx.get(feature)
+        try:
+            for test in tests:
+                if not test(value):
+                    return False
+        except TypeError:
+            return False
+        return True
+
+    return RULE_FEATURES[feature][0], condition
+
+def _rate_cap(spec):
+    """Messages a message_rate condition has to be able to count: its largest operand + 1"""
+    if not isinstance(spec, dict):
+        spec = {"==": spec}
+    operands = []
+    for operand in spec.values():
+        operands.extend(operand if isinstance(operand, (list, tuple, set, frozenset)) else [operand])
+    numbers = [int(operand) for operand in operands if isinstance(operand, (int, float)) and not isinstance(operand, bool)]
+    return max(numbers) + 1 if numbers else 0
+
+class AutoModRule:
+    """A rule from automod_config.json compiled into one closure.
+
+    Conditions are sorted by feature cost and stop at the first one that
+    fails; exemptions are checked before any of them. Evaluations, hits
+    and time spent are counted for /automodrules.
+    """
+
+    def __init__(self, spec, exempt_channels=(), exempt_roles=()):
+        self.name = spec["name"]
+        self.type = spec.get("type", self.name)
+        self.action = spec.get("action", "warn")
+        if self.action not in RULE_ACTIONS:
+            raise ValueError(f"unknown action '{self.action}'")
+        self.reason = spec.get("reason", f"Rule {self.name}")
+        self.cluster = spec.get("cluster", False)
+        self.stateful = not STATEFUL_FEATURES.isdisjoint(spec.get("conditions", {}))
+        self.rate_cap = _rate_cap(spec["conditions"]["message_rate"]) if "message_rate" in spec.get("conditions", {}) else 0
+
+        conditions = sorted(
+            (_compile_condition(feature, condition) for feature, condition in spec.get("conditions", {}).items()),
+            key=lambda item: item[0]
+        )
+        if not conditions:
+            raise ValueError("rule has no conditions")
+        self.cost = sum(cost for cost, _ in conditions)
+        checks = tuple(condition for _, condition in conditions)
+        channels = frozenset(map(int, spec.get("exempt_channels", []))) | frozenset(exempt_channels)
+        roles = frozenset(map(int, spec.get("exempt_roles", []))) | frozenset(exempt_roles)
+
+        def check(ctx):
+            message = ctx.message
+            if channels and (message.channel.id in channels or getattr(message.channel, "category_id", None) in channels):
+                return False
+            if roles and any(role.id in roles for role in getattr(message.author, "roles", ())):
+                return False
+            for condition in checks:
+                if not condition(ctx):
+                    return False
+            return True
+
+        self.check = check
+
+        # Counters
+        self.evaluations = 0
+        self.hits = 0
+        self.total_ns = 0
+
+    def format_reason(self, ctx):
+        try:
+            return self.reason.format_map(_ReasonValues(ctx))
+        except (KeyError, ValueError, IndexError, AttributeError):
+            return self.reason
+
+    def take_stats(self, other):
+        self.evaluations = other.evaluations
+        self.hits = other.hits
+        self.total_ns = other.total_ns
+
+def builtin_rule_specs(config):
+    """The classic *_protection sections and banned words, expressed as rules"""
+    specs = []
+
+    if config.get("banned_words"):
+        specs.append({
+            "name": "banned_word",
+            "conditions": {"banned_word": {"!=": None}},
+            "action": "delete",
+            "reason": "Banned word detected"
+        })
+
+    spam_config = config.get("spam_protection", {})
+    if spam_config.get("enabled", False):
+        max_messages = spam_config.get("max_messages", 5)
+        specs.append({
+            "name": "spam",
+            "conditions": {"message_rate": {">": max_messages}},
+            "action": spam_config.get("punishment", "warn"),
+            "reason": "Spam detected ({message_rate} messages in " + f"{spam_config.get('time_window', 10)}s)"
+        })
+
+    if config.get("invite_protection", {}).get("enabled", False):
+        specs.append({
+            "name": "invite",
+            "conditions": {"has_invite": True},
+            "action": config["invite_protection"].get("punishment", "delete"),
+            "reason": "Discord invite detected"
+        })
+
+    mention_config = config.get("mention_protection", {})
+    if mention_config.get("enabled", False):
+        max_mentions = mention_config.get("max_mentions", 5)
+        specs.append({
+            "name": "mentions",
+            "conditions": {"mentions": {">": max_mentions}},
+            "action": mention_config.get("punishment", "warn"),
+            "reason": "Too many mentions ({mentions}/" + f"{max_mentions})"
+        })
+
+    caps_config = config.get("caps_protection", {})
+    if caps_config.get("enabled", False):
+        max_caps = caps_config.get("max_caps", 70)
+        specs.append({
+            "name": "caps",
+            "conditions": {"length": {">=": caps_config.get("min_length", 10)}, "caps_percentage": {">": max_caps}},
+            "action": caps_config.get("punishment", "warn"),
+            "reason": "Too many caps ({caps_percentage:.1f}%/" + f"{max_caps}%)"
+        })
+
+    link_config = config.get("link_protection", {})
+    if link_config.get("enabled", False):
+        punishment = link_config.get("punishment", "delete")
+        specs.append({
+            "name": "blocked_link",
+            "type": "link",
+            "conditions": {"url_count": {">": 0}, "blocked_domain": {"!=": None}},
+            "action": punishment,
+            "reason": "Blocked link detected: {blocked_domain}"
+        })
+        if link_config.get("mode", LINK_MODE_ALLOWLIST) == LINK_MODE_ALLOWLIST:
+            specs.append({
+                "name": "unlisted_link",
+                "type": "link",
+                "conditions": {"url_count": {">": 0}, "unlisted_domain": {"!=": None}},
+                "action": punishment,
+                "reason": "Unwanted link detected: {unlisted_domain}"
+            })
+
+    flood_config = config.get("flood_protection", {})
+    if flood_config.get("enabled", False):
+        specs.append({
+            "name": "flood",
+            "conditions": {"length": {">=": flood_config.get("min_length", 20)}, "flood_size": {">": flood_config.get("max_duplicates", 4)}},
+            "action": flood_config.get("punishment", "delete"),
+            "cluster": True,
+            "reason": "Message flood detected ({flood_size} near-identical messages in " + f"{flood_config.get('time_window', 30)}s)"
+        })
+
+    return specs
+
+def compile_rules(config):
+    """Built-in and custom rules of a guild, cheapest first; broken custom rules are skipped"""
+    exempt_channels = frozenset(map(int, config.get("exempt_channels", [])))
+    exempt_roles = frozenset(map(int, config.get("exempt_roles", [])))
+    rules = []
+    for spec in builtin_rule_specs(config) + [rule for rule in config.get("rules", []) if rule.get("enabled", True)]:
+        try:
+            rules.append(AutoModRule(spec, exempt_channels, exempt_roles))
+        except (KeyError, ValueError, TypeError, re.error) as e:
+            print(f"Error compiling automod rule {spec.get('name', '?')}: {e}")
+    # sorted() is stable, so equally cheap rules keep their configured order
+    return sorted(rules, key=lambda rule: rule.cost)
+
 class AutoMod(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.automod_file = "automod_config.json"
         self.automod_config = self.load_automod_config()
         self.violations_file = "automod_violations.json"
-        self.violations = self.load_violations()
+        self.violations = ViolationJournal(self.violations_file)
+        # Compiled banned word matchers per guild, rebuilt when the list changes
+        self.word_matchers = {}
+        self.word_matcher_generations = {}
+        # Compiled allowed_domains per guild, and the shared blocklist (loaded in the background)
+        self.domain_allowlists = {}
+        self.domain_blocklist = DomainTrie()
+        # Recent message times for the spam check
+        self.message_rates = MessageRateTracker()
+        # Recent message fingerprints for the flood check
+        self.floods = FloodDetector()
+        # Bulk deletes, merged DMs and concurrent kicks/bans
+        self.punisher = PunishmentExecutor()
+        self.punisher.start()
+        # Grouped log channel digests
+        self.log_digest = LogDigest()
+        # Compiled rules per guild (dropped on config changes) and their counters
+        self.rule_sets = {}
+        self.rule_stats = {}
+        # Largest message_rate count any rule of a guild compares against
+        self.rate_caps = {}
         
         # Start monitoring task
-        self.bot.loop.create_task(self.monitor_messages())
+        self.monitor_task = self.bot.loop.create_task(self.monitor_messages())
+        self.bot.loop.create_task(self.load_domain_blocklist())
+    
+    async def cog_unload(self):
+        self.monitor_task.cancel()
+        await self.punisher.close()
+        await self.log_digest.close()
+        self.violations.close()
     
     def load_automod_config(self):
         try:
@@ -39,29 +1232,13 @@ class AutoMod(commands.Cog):
         except Exception as e:
             print(f"Error saving automod config: {e}")
     
-    def load_violations(self):
-        try:
-            if os.path.exists(self.violations_file):
-                with open(self.violations_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
-        except Exception as e:
-            print(f"Error loading violations: {e}")
-            return {}
-    
-    def save_violations(self):
-        try:
-            with open(self.violations_file, 'w', encoding='utf-8') as f:
-                json.dump(self.violations, f, indent=4, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error saving violations: {e}")
-    
     def get_guild_config(self, guild_id):
         guild_id_str = str(guild_id)
         if guild_id_str not in self.automod_config:
             self.automod_config[guild_id_str] = {
                 "enabled": False,
                 "banned_words": [],
+                "banned_words_mode": WORD_MODE_SUBSTRING,
                 "spam_protection": {
                     "enabled": False,
                     "max_messages": 5,
@@ -86,37 +1263,100 @@ class AutoMod(commands.Cog):
                 "link_protection": {
                     "enabled": False,
                     "allowed_domains": [],
+                    "mode": LINK_MODE_ALLOWLIST,
+                    "punishment": "delete"
+                },
+                "flood_protection": {
+                    "enabled": False,
+                    "max_duplicates": 4,
+                    "time_window": 30,
+                    "min_length": 20,
                     "punishment": "delete"
                 }
             }
         return self.automod_config[guild_id_str]
     
-    def add_violation(self, user_id, guild_id, violation_type):
-        user_id_str = str(user_id)
+    def get_word_matcher(self, guild_id, config):
+        """Compiled matcher for a guild's banned words (cached until the list or mode changes)"""
         guild_id_str = str(guild_id)
-        
-        if user_id_str not in self.violations:
-            self.violations[user_id_str] = {}
-        
-        if guild_id_str not in self.violations[user_id_str]:
-            self.violations[user_id_str][guild_id_str] = []
-        
-        self.violations[user_id_str][guild_id_str].append({
-            "type": violation_type,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        self.save_violations()
-        return len(self.violations[user_id_str][guild_id_str])
+        mode = config.get("banned_words_mode", WORD_MODE_SUBSTRING)
+        matcher = self.word_matchers.get(guild_id_str)
+        if matcher is None or matcher.mode != mode:
+            matcher = self.word_matchers[guild_id_str] = BannedWordMatcher(config.get("banned_words", []), mode)
+        return matcher
+    
+    async def rebuild_word_matcher(self, guild_id, config):
+        """Compile the automaton off the event loop after the word list changed"""
+        guild_id_str = str(guild_id)
+        words = list(config.get("banned_words", []))
+        mode = config.get("banned_words_mode", WORD_MODE_SUBSTRING)
+        # Builds can finish out of order; only the newest edit may install its matcher
+        generation = self.word_matcher_generations.get(guild_id_str, 0) + 1
+        self.word_matcher_generations[guild_id_str] = generation
+        matcher = await asyncio.to_thread(BannedWordMatcher, words, mode)
+        if self.word_matcher_generations.get(guild_id_str) == generation:
+            self.word_matchers[guild_id_str] = matcher
+    
+    def get_rules(self, guild_id, config):
+        """Compiled rules for a guild, rebuilt after invalidate_rules"""
+        guild_id_str = str(guild_id)
+        rules = self.rule_sets.get(guild_id_str)
+        if rules is None:
+            rules = self.rule_sets[guild_id_str] = compile_rules(config)
+            # Counters survive recompiles for rules that keep their name
+            previous = self.rule_stats.get(guild_id_str, {})
+            for rule in rules:
+                if rule.name in previous:
+                    rule.take_stats(previous[rule.name])
+            self.rule_stats[guild_id_str] = {rule.name: rule for rule in rules}
+            self.rate_caps[guild_id_str] = max((rule.rate_cap for rule in rules), default=0)
+        return rules
+    
+    def invalidate_rules(self, guild_id):
+        """Drop the compiled rules and allowlist of a guild after its config changed"""
+        self.rule_sets.pop(str(guild_id), None)
+        self.domain_allowlists.pop(str(guild_id), None)
+    
+    def get_domain_allowlist(self, guild_id, link_config):
+        """Compiled allowed_domains for a guild, rebuilt after invalidate_rules"""
+        guild_id_str = str(guild_id)
+        allowlist = self.domain_allowlists.get(guild_id_str)
+        if allowlist is None:
+            allowlist = self.domain_allowlists[guild_id_str] = DomainTrie(link_config.get("allowed_domains", []))
+        return allowlist
+    
+    async def load_domain_blocklist(self):
+        """Load LINK_BLOCKLIST_FILE off the event loop, if it exists"""
+        if not os.path.exists(LINK_BLOCKLIST_FILE):
+            return
+        try:
+            self.domain_blocklist = await asyncio.to_thread(DomainTrie.from_file, LINK_BLOCKLIST_FILE)
+            print(f"AutoMod blocklist loaded: {len(self.domain_blocklist)} domains")
+        except Exception as e:
+            print(f"Error loading domain blocklist: {e}")
+    
+    def add_violation(self, user_id, guild_id, violation_type):
+        return self.violations.add(user_id, guild_id, violation_type)
     
     async def monitor_messages(self):
-        """Monitor messages for automod violations"""
+        """Housekeeping: idle message-rate buffers and violation journal compaction"""
         await self.bot.wait_until_ready()
         
         while not self.bot.is_closed():
             try:
-                # This will be handled in on_message event
-                await asyncio.sleep(1)
+                # Checks themselves run in on_message
+                await asyncio.sleep(SPAM_SWEEP_INTERVAL)
+                idle = max(
+                    [SPAM_IDLE_SECONDS] + [
+                        config.get("spam_protection", {}).get("time_window", 10)
+                        for config in self.automod_config.values()
+                    ]
+                )
+                self.message_rates.expire(idle)
+                self.floods.expire()
+                
+                if self.violations.needs_compaction():
+                    await self.violations.compact()
             except Exception as e:
                 print(f"Error in monitor_messages: {e}")
                 await asyncio.sleep(5)
@@ -136,167 +1376,56 @@ class AutoMod(commands.Cog):
         if not config.get("enabled", False):
             return
         
-        # Check for violations
-        await self.check_banned_words(message, config)
-        await self.check_spam(message, config)
-        await self.check_invites(message, config)
-        await self.check_mentions(message, config)
-        await self.check_caps(message, config)
-        await self.check_links(message, config)
-    
-    async def check_banned_words(self, message, config):
-        """Check for banned words"""
-        banned_words = config.get("banned_words", [])
-        if not banned_words:
-            return
-        
-        content_lower = message.content.lower()
-        for word in banned_words:
-            if word.lower() in content_lower:
-                await self.handle_violation(message, "banned_word", "Banned word detected")
-                break
-    
-    async def check_spam(self, message, config):
-        """Check for spam"""
-        spam_config = config.get("spam_protection", {})
-        if not spam_config.get("enabled", False):
-            return
-        
-        user_id = str(message.author.id)
-        guild_id = str(message.guild.id)
-        max_messages = spam_config.get("max_messages", 5)
-        time_window = spam_config.get("time_window", 10)
-        
-        # Count recent messages
-        recent_count = 0
-        now = datetime.now()
-        
-        if user_id in self.violations and guild_id in self.violations[user_id]:
-            for violation in self.violations[user_id][guild_id]:
-                if violation["type"] == "spam":
-                    violation_time = datetime.fromisoformat(violation["timestamp"])
-                    if (now - violation_time).total_seconds() < time_window:
-                        recent_count += 1
-        
-        if recent_count >= max_messages:
-            await self.handle_violation(message, "spam", "Spam detected")
-    
-    async def check_invites(self, message, config):
-        """Check for Discord invites"""
-        invite_config = config.get("invite_protection", {})
-        if not invite_config.get("enabled", False):
-            return
-        
-        # Pattern for Discord invites
-        invite_pattern = r'(discord\.gg/|discord\.com/invite/|discordapp\.com/invite/)[\w-]+'
-        if re.search(invite_pattern, message.content, re.IGNORECASE):
-            await self.handle_violation(message, "invite", "Discord invite detected")
-    
-    async def check_mentions(self, message, config):
-        """Check for excessive mentions"""
-        mention_config = config.get("mention_protection", {})
-        if not mention_config.get("enabled", False):
-            return
-        
-        max_mentions = mention_config.get("max_mentions", 5)
-        mention_count = len(message.mentions)
+        # Scan once, then run the compiled rules cheapest-first on the shared features
+        features = MessageFeatures.from_message(message)
+        ctx = RuleContext(self, message, config, features)
+        removed = False
         
-        if mention_count > max_mentions:
-            await self.handle_violation(message, "mentions", f"Too many mentions ({mention_count}/{max_mentions})")
-    
-    async def check_caps(self, message, config):
-        """Check for excessive caps"""
-        caps_config = config.get("caps_protection", {})
-        if not caps_config.get("enabled", False):
-            return
-        
-        max_caps = caps_config.get("max_caps", 70)
-        min_length = caps_config.get("min_length", 10)
-        
-        if len(message.content) < min_length:
-            return
-        
-        caps_count = sum(1 for c in message.content if c.isupper())
-        caps_percentage = (caps_count / len(message.content)) * 100
-        
-        if caps_percentage > max_caps:
-            await self.handle_violation(message, "caps", f"Too many caps ({caps_percentage:.1f}%/{max_caps}%)")
-    
-    async def check_links(self, message, config):
-        """Check for unwanted links"""
-        link_config = config.get("link_protection", {})
-        if not link_config.get("enabled", False):
-            return
-        
-        # Pattern for URLs
-        url_pattern = r'https?://[^\s]+'
-        urls = re.findall(url_pattern, message.content)
-        
-        if not urls:
-            return
-        
-        allowed_domains = link_config.get("allowed_domains", [])
-        
-        for url in urls:
-            domain = url.split('/')[2].lower()
-            if not any(allowed in domain for allowed in allowed_domains):
-                await self.handle_violation(message, "link", f"Unwanted link detected: {domain}")
-                break
+        for rule in self.get_rules(message.guild.id, config):
+            if removed and not rule.stateful:
+                continue
+            start = time.perf_counter_ns()
+            matched = rule.check(ctx)
+            rule.total_ns += time.perf_counter_ns() - start
+            rule.evaluations += 1
+            if not matched:
+                continue
+            
+            rule.hits += 1
+            reason = rule.format_reason(ctx)
+            if rule.cluster and ctx.cluster:
+                # Punish the whole cluster once, including the copies sent before the threshold
+                for entry in ctx.cluster:
+                    if not entry[3]:
+                        entry[3] = True
+                        await self.handle_violation(entry[2], rule.type, reason, rule.action)
+            else:
+                await self.handle_violation(message, rule.type, reason, rule.action)
+            
+            if rule.action in TERMINAL_ACTIONS:
+                removed = True
     
-    async def handle_violation(self, message, violation_type, reason):
+    async def handle_violation(self, message, violation_type, reason, punishment):
         """Handle automod violations"""
-        guild_id = str(message.guild.id)
-        config = self.get_guild_config(message.guild.id)
-        
-        # Get punishment for this violation type
-        punishment = "warn"
-        if violation_type == "banned_word":
-            punishment = "delete"
-        elif violation_type == "spam":
-            punishment = config.get("spam_protection", {}).get("punishment", "warn")
-        elif violation_type == "invite":
-            punishment = config.get("invite_protection", {}).get("punishment", "delete")
-        elif violation_type == "mentions":
-            punishment = config.get("mention_protection", {}).get("punishment", "warn")
-        elif violation_type == "caps":
-            punishment = config.get("caps_protection", {}).get("punishment", "warn")
-        elif violation_type == "link":
-            punishment = config.get("link_protection", {}).get("punishment", "delete")
-        
         # Add violation
         violation_count = self.add_violation(message.author.id, message.guild.id, violation_type)
         
-        # Apply punishment
+        # Apply punishment (queued, see PunishmentExecutor); "log" only records and logs
         if punishment == "delete":
-            try:
-                await message.delete()
-                await message.author.send(f"⚠️ Deine Nachricht wurde gelöscht: {reason}")
-            except:
-                pass
+            self.punisher.delete(message)
+            self.punisher.notify(message.author, f"⚠️ Deine Nachricht wurde gelöscht: {reason}")
         
         elif punishment == "warn":
-            try:
-                await message.author.send(f"⚠️ Warnung: {reason}")
-            except:
-                pass
+            self.punisher.notify(message.author, f"⚠️ Warnung: {reason}")
         
-        elif punishment == "kick":
-            try:
-                await message.guild.kick(message.author, reason=f"AutoMod: {reason}")
-            except:
-                pass
-        
-        elif punishment == "ban":
-            try:
-                await message.guild.ban(message.author, reason=f"AutoMod: {reason}")
-            except:
-                pass
+        elif punishment in ("kick", "ban"):
+            self.punisher.remove(message.guild, message.author, punishment, f"AutoMod: {reason}")
         
         # Log to channel if configured
         await self.log_violation(message, violation_type, reason, punishment, violation_count)
     
     async def log_violation(self, message, violation_type, reason, punishment, count):
-        """Log violations to a channel"""
+        """Log violations to a channel (buffered, see LogDigest)"""
         try:
             guild_id = str(message.guild.id)
             config = self.get_guild_config(message.guild.id)
@@ -309,34 +1438,18 @@ class AutoMod(commands.Cog):
             if not log_channel:
                 return
             
-            embed = discord.Embed(
-                title="🛡️ AutoMod Violation",
-                description=f"**User:** {message.author.mention}\n**Violation:** {violation_type}\n**Reason:** {reason}\n**Punishment:** {punishment}\n**Count:** {count}",
-                color=discord.Color.red()
-            )
-            
-            embed.add_field(
-                name="Message Content",
-                value=message.content[:500] + "..." if len(message.content) > 500 else message.content,
-                inline=False
-            )
-            
-            embed.add_field(
-                name="Channel",
-                value=message.channel.mention,
-                inline=True
-            )
-            
-            embed.add_field(
-                name="Time",
-                value=message.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                inline=True
-            )
-            
-            embed.set_thumbnail(url=message.author.display_avatar.url)
-            embed.set_footer(text=VANTAX_FOOTER)
-            
-            await log_channel.send(embed=embed)
+            self.log_digest.add(log_channel, {
+                "user_id": message.author.id,
+                "user": message.author.mention,
+                "avatar": message.author.display_avatar.url,
+                "type": violation_type,
+                "reason": reason,
+                "punishment": punishment,
+                "count": count,
+                "content": message.content,
+                "channel": message.channel.mention,
+                "time": message.created_at.strftime("%Y-%m-%d %H:%M:%S")
+            }, urgent=punishment in ("kick", "ban"))
             
         except Exception as e:
             print(f"Error logging violation: {e}")
@@ -403,6 +1516,22 @@ class AutoMod(commands.Cog):
                 inline=True
             )
             
+            # Flood protection
+            flood_config = config.get("flood_protection", {})
+            embed.add_field(
+                name="🌊 Flood Protection",
+                value=f"{'✅' if flood_config.get('enabled', False) else '❌'} {flood_config.get('max_duplicates', 4)}/{flood_config.get('time_window', 30)}s",
+                inline=True
+            )
+            
+            # Custom rules
+            custom_rules = config.get("rules", [])
+            embed.add_field(
+                name="📜 Eigene Regeln",
+                value=f"{sum(1 for rule in custom_rules if rule.get('enabled', True))}/{len(custom_rules)} aktiv" if custom_rules else "Keine",
+                inline=True
+            )
+            
             embed.set_footer(text=VANTAX_FOOTER)
             await interaction.response.send_message(embed=embed)
             
@@ -447,6 +1576,8 @@ class AutoMod(commands.Cog):
             if word.lower() not in config["banned_words"]:
                 config["banned_words"].append(word.lower())
                 self.save_automod_config()
+                await self.rebuild_word_matcher(interaction.guild.id, config)
+                self.invalidate_rules(interaction.guild.id)
                 
                 embed = discord.Embed(
                     title="🚫 Banned Word Added",
@@ -478,6 +1609,8 @@ class AutoMod(commands.Cog):
             if word.lower() in config["banned_words"]:
                 config["banned_words"].remove(word.lower())
                 self.save_automod_config()
+                await self.rebuild_word_matcher(interaction.guild.id, config)
+                self.invalidate_rules(interaction.guild.id)
                 
                 embed = discord.Embed(
                     title="✅ Banned Word Removed",
@@ -498,6 +1631,99 @@ class AutoMod(commands.Cog):
             print(f"Error removing banned word: {e}")
             await interaction.response.send_message("❌ Ein Fehler ist aufgetreten.", ephemeral=True)
 
+    @app_commands.command(name="bannedwordmode", description="Lege fest, ob verbotene Wörter als Teilwort oder nur als ganzes Wort zählen")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @app_commands.choices(modus=[
+        app_commands.Choice(name="Teilwort (Standard)", value=WORD_MODE_SUBSTRING),
+        app_commands.Choice(name="Ganzes Wort", value=WORD_MODE_WHOLE)
+    ])
+    async def banned_word_mode(self, interaction: discord.Interaction, modus: app_commands.Choice[str]):
+        """Switch banned word matching between substring and whole-word mode"""
+        try:
+            guild_id = str(interaction.guild.id)
+            config = self.get_guild_config(interaction.guild.id)
+            
+            config["banned_words_mode"] = modus.value
+            self.save_automod_config()
+            await self.rebuild_word_matcher(interaction.guild.id, config)
+            
+            embed = discord.Embed(
+                title="🚫 Banned Word Modus",
+                description=f"Verbotene Wörter werden jetzt als **{modus.name}** erkannt!",
+                color=VANTAX_COLOR
+            )
+            
+            embed.set_footer(text=VANTAX_FOOTER)
+            await interaction.response.send_message(embed=embed)
+            
+        except Exception as e:
+            print(f"Error setting banned word mode: {e}")
+            await interaction.response.send_message("❌ Ein Fehler ist aufgetreten.", ephemeral=True)
+    
+    @app_commands.command(name="linkmode", description="Lege fest, welche Links die Link Protection entfernt")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @app_commands.choices(modus=[
+        app_commands.Choice(name="Alle außer erlaubten Domains (Standard)", value=LINK_MODE_ALLOWLIST),
+        app_commands.Choice(name="Nur bekannte schädliche Domains", value=LINK_MODE_BLOCKLIST)
+    ])
+    async def link_mode(self, interaction: discord.Interaction, modus: app_commands.Choice[str]):
+        """Switch link protection between allowlist and blocklist mode"""
+        try:
+            config = self.get_guild_config(interaction.guild.id)
+            
+            config.setdefault("link_protection", {})["mode"] = modus.value
+            self.save_automod_config()
+            self.invalidate_rules(interaction.guild.id)
+            
+            embed = discord.Embed(
+                title="🔗 Link Protection Modus",
+                description=f"Link Protection: **{modus.name}**\nBlocklist: {len(self.domain_blocklist)} Domains",
+                color=VANTAX_COLOR
+            )
+            
+            embed.set_footer(text=VANTAX_FOOTER)
+            await interaction.response.send_message(embed=embed)
+            
+        except Exception as e:
+            print(f"Error setting link mode: {e}")
+            await interaction.response.send_message("❌ Ein Fehler ist aufgetreten.", ephemeral=True)
+
+    @app_commands.command(name="automodrules", description="Zeige die AutoMod Regeln mit Treffern und Laufzeit")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def automod_rules(self, interaction: discord.Interaction):
+        """Show compiled rules with hit counts and evaluation time, most expensive first"""
+        try:
+            config = self.get_guild_config(interaction.guild.id)
+            rules = sorted(self.get_rules(interaction.guild.id, config), key=lambda rule: rule.total_ns, reverse=True)
+            
+            embed = discord.Embed(
+                title="📜 AutoMod Regeln",
+                description=f"{len(rules)} Regeln, ausgewertet nach Kosten (günstigste zuerst)" if rules else "Keine aktiven Regeln",
+                color=VANTAX_COLOR
+            )
+            
+            # One field is kept for the punishment queue
+            for rule in rules[:24]:
+                avg_us = rule.total_ns / rule.evaluations / 1000 if rule.evaluations else 0.0
+                embed.add_field(
+                    name=f"{rule.name} → {rule.action}",
+                    value=f"Treffer: {rule.hits}/{rule.evaluations}\nØ {avg_us:.1f} µs · Σ {rule.total_ns / 1e6:.1f} ms\nKosten: {rule.cost}",
+                    inline=True
+                )
+            
+            embed.add_field(
+                name="⚙️ Strafen-Warteschlange (alle Server)",
+                value="\n".join(f"{key}: {value}" for key, value in self.punisher.stats().items()),
+                inline=False
+            )
+            
+            embed.set_footer(text=VANTAX_FOOTER)
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            
+        except Exception as e:
+            print(f"Error showing automod rules: {e}")
+            await interaction.response.send_message("❌ Ein Fehler ist aufgetreten.", ephemeral=True)
+
 async def setup(bot):
     try:
         await bot.add_cog(AutoMod(bot))
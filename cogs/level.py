@@ -1,12 +1,54 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+from discord.ui import View, Button
 import json
 import os
 import datetime
 import random
+import asyncio
+import tempfile
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from bisect import bisect_left, bisect_right, insort
+
+try:
+    import numpy as np
+except ImportError:  # optional, only speeds up bulk conversions
+    np = None
 
 LEVEL_FILE = "leveldata.json"
+LEVEL_DB = "leveldata.db"
+# Storage backend: "json" (whole tree in memory) or "sqlite" (indexed table + LRU cache)
+LEVEL_BACKEND = os.getenv("LEVEL_BACKEND", "json").lower()
+LEVEL_CACHE_SIZE = int(os.getenv("LEVEL_CACHE_SIZE", 50000))
+# Archived seasons; "monthly" resets every guild when a new month starts, "manual" only via /seasonreset
+LEVEL_SEASON_DB = "level_seasons.db"
+LEVEL_SEASONS = os.getenv("LEVEL_SEASONS", "manual").lower()
+# Minimum seconds between two XP awards for the same user
+XP_COOLDOWN = 30
+# Voice XP is awarded to everyone in voice once per tick
+VOICE_TICK = 60
+# Level-up side effects (embed, roles, DMs) are handled by a small worker pool
+LEVELUP_WORKERS = 3
+LEVELUP_QUEUE_SIZE = 1000
+# Leaderboard pages rendered and cached per guild
+LEADERBOARD_PAGE_SIZE = 10
+LEADERBOARD_CACHED_PAGES = 20
+
+# Special rewards for milestone levels
+MILESTONE_REWARDS = {
+    5: "🏅 Bronze Mitglied",
+    10: "🥈 Silber Mitglied",
+    25: "🥇 Gold Mitglied",
+    50: "💎 Diamant Mitglied",
+    100: "👑 Legendär Mitglied"
+}
+# Write-behind: flush every FLUSH_INTERVAL seconds or as soon as FLUSH_THRESHOLD entries are dirty
+FLUSH_INTERVAL = float(os.getenv("LEVEL_FLUSH_INTERVAL", 30))
+FLUSH_THRESHOLD = int(os.getenv("LEVEL_FLUSH_THRESHOLD", 500))
 VANTAX_COLOR = discord.Color.blurple()
 VANTAX_FOOTER = "VANTAX Discord Bot by Maurice"
 
@@ -22,29 +64,1396 @@ XP_REWARDS = {
 def get_xp_for_level(level):
     return int(100 * (level ** 1.5))
 
+class LevelTable:
+    """Precomputed XP thresholds for get_xp_for_level, extended lazily.
+
+    thresholds[i] holds the XP needed for level i + 1, so the level for an
+    XP value is a single bisect instead of a walk over every level.
+    """
+
+    def __init__(self, initial_levels=128):
+        self.thresholds = []
+        self._array = None
+        self.extend(max(initial_levels, 2))
+
+    @property
+    def max_level(self):
+        return len(self.thresholds)
+
+    def extend(self, max_level):
+        for level in range(len(self.thresholds) + 1, max_level + 1):
+            self.thresholds.append(get_xp_for_level(level))
+        self._array = None
+
+    def _cover_xp(self, xp):
+        """Grow the table until it contains a threshold above xp"""
+        while xp >= self.thresholds[-1]:
+            self.extend(self.max_level * 2)
+
+    def xp_for_level(self, level):
+        if level < 1:
+            return get_xp_for_level(level)
+        if level > self.max_level:
+            self.extend(max(level, self.max_level * 2))
+        return self.thresholds[level - 1]
+
+    def level_from_xp(self, xp):
+        self._cover_xp(xp)
+        return max(1, bisect_right(self.thresholds, xp))
+
+    def levels_from_xp(self, xp_values):
+        """Convert many XP values in one pass (vectorized when NumPy is available)"""
+        xp_values = list(xp_values)
+        if not xp_values:
+            return []
+        self._cover_xp(max(xp_values))
+
+        if np is not None:
+            if self._array is None:
+                self._array = np.asarray(self.thresholds, dtype=np.int64)
+            levels = np.searchsorted(self._array, np.asarray(xp_values, dtype=np.int64), side="right")
+            return np.maximum(levels, 1).tolist()
+
+        thresholds = self.thresholds
+        return [max(1, bisect_right(thresholds, xp)) for xp in xp_values]
+
+LEVEL_TABLE = LevelTable()
+
 def get_level_from_xp(xp):
-    level = 1
-    while xp >= get_xp_for_level(level + 1):
-        level += 1
-    return level
+    return LEVEL_TABLE.level_from_xp(xp)
+
+def levels_from_xp(xp_values):
+    """Bulk version of get_level_from_xp, e.g. for a whole guild or a migration"""
+    return LEVEL_TABLE.levels_from_xp(xp_values)
 
 # Hilfsfunktionen
 
-def load_data():
-    if not os.path.isfile(LEVEL_FILE):
-        with open(LEVEL_FILE, "w") as f:
+def load_data(path=LEVEL_FILE):
+    if not os.path.isfile(path):
+        with open(path, "w") as f:
             json.dump({}, f)
-    with open(LEVEL_FILE, "r") as f:
+    with open(path, "r") as f:
         return json.load(f)
 
-def save_data(data):
-    with open(LEVEL_FILE, "w") as f:
-        json.dump(data, f)
+def save_data(data, path=LEVEL_FILE):
+    """Write the level data atomically (temp file + rename)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".leveldata-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def save_encoded_data(encoded, path=LEVEL_FILE):
+    """Write {gid: {uid: entry JSON text}} as leveldata.json, atomically.
+
+    Produces the same layout as save_data(), without encoding any entry again.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".leveldata-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write("{")
+            for i, (gid, users) in enumerate(encoded.items()):
+                f.write((", " if i else "") + json.dumps(gid) + ": {")
+                f.write(", ".join(json.dumps(uid) + ": " + text for uid, text in users.items()))
+                f.write("}")
+            f.write("}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def new_user_entry():
+    return {
+        "xp": 0,
+        "level": 1,
+        "messages": 0,
+        "last_message": None,
+        "streak": 0
+    }
+
+class _JsonStream:
+    """Minimal incremental reader for the fixed leveldata.json layout"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        if not chunk:
+            self.eof = True
+
+    def peek(self):
+        """Next non-whitespace character ('' at end of file)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill()
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}, got '{found}'")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next string or object (both are self-delimiting)"""
+        self.peek()
+        while True:
+            try:
+                value, self.pos = self.decoder.raw_decode(self.buf, self.pos)
+                return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._fill()
+
+def iter_level_file(path=LEVEL_FILE, chunk_size=1 << 16):
+    """Stream (gid, uid, entry) from leveldata.json without loading the whole file"""
+    with open(path, "r", encoding="utf-8") as f:
+        stream = _JsonStream(f, chunk_size)
+        if stream.peek() == "":
+            return
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            gid = stream.value()
+            stream.expect(":")
+            stream.expect("{")
+            if stream.peek() != "}":
+                while True:
+                    uid = stream.value()
+                    stream.expect(":")
+                    yield gid, uid, stream.value()
+                    if stream.peek() != ",":
+                        break
+                    stream.expect(",")
+            stream.expect("}")
+            if stream.peek() != ",":
+                break
+            stream.expect(",")
+        stream.expect("}")
+
+UPSERT_LEVEL_SQL = """
+    INSERT INTO levels (guild_id, user_id, xp, level, messages, last_message, streak)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (guild_id, user_id) DO UPDATE SET
+        xp = excluded.xp,
+        level = excluded.level,
+        messages = excluded.messages,
+        last_message = excluded.last_message,
+        streak = excluded.streak
+"""
+
+def connect_level_db(path=LEVEL_DB):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS levels (
+            guild_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            xp INTEGER NOT NULL DEFAULT 0,
+            level INTEGER NOT NULL DEFAULT 1,
+            messages INTEGER NOT NULL DEFAULT 0,
+            last_message TEXT,
+            streak INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, user_id)
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_levels_guild_xp ON levels (guild_id, xp DESC, user_id)")
+    conn.commit()
+    return conn
+
+def import_level_json(json_path, conn, batch_size=1000):
+    """Stream a leveldata.json file into the levels table, returns the number of rows"""
+    imported = 0
+    batch = []
+    for gid, uid, entry in iter_level_file(json_path):
+        batch.append((
+            gid, uid,
+            entry.get("xp", 0),
+            entry.get("level", 1),
+            entry.get("messages", 0),
+            entry.get("last_message"),
+            entry.get("streak", 0)
+        ))
+        if len(batch) >= batch_size:
+            with conn:
+                conn.executemany(UPSERT_LEVEL_SQL, batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        with conn:
+            conn.executemany(UPSERT_LEVEL_SQL, batch)
+        imported += len(batch)
+    return imported
+
+class RankIndex:
+    """Order-statistics index over the XP of one guild.
+
+    Keys (-xp, uid) are kept in sorted buckets; a Fenwick tree over the
+    bucket lengths maps positions to buckets, so an XP update, a user's rank
+    and any leaderboard page cost O(log n) instead of a full sort.
+    """
+
+    BUCKET_SIZE = 512
+
+    def __init__(self, items=()):
+        self._xp = dict(items)
+        keys = sorted((-xp, uid) for uid, xp in self._xp.items())
+        size = self.BUCKET_SIZE
+        self._buckets = [keys[i:i + size] for i in range(0, len(keys), size)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._rebuild_tree()
+
+    def __len__(self):
+        return len(self._xp)
+
+    def __contains__(self, uid):
+        return uid in self._xp
+
+    def _rebuild_tree(self):
+        count = len(self._buckets)
+        tree = [0] * (count + 1)
+        for i, bucket in enumerate(self._buckets, start=1):
+            tree[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent <= count:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, index, delta):
+        index += 1
+        tree = self._tree
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+
+    def _prefix(self, index):
+        """Number of keys in buckets[0:index]"""
+        total = 0
+        tree = self._tree
+        while index:
+            total += tree[index]
+            index -= index & -index
+        return total
+
+    def _locate(self, position):
+        """Map a 0-based position to (bucket index, offset in bucket)"""
+        tree = self._tree
+        index = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            candidate = index + step
+            if candidate < len(tree) and tree[candidate] <= position:
+                index = candidate
+                position -= tree[candidate]
+            step >>= 1
+        return index, position
+
+    def _insert(self, key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._rebuild_tree()
+            return
+
+        i = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[i]
+        insort(bucket, key)
+        self._maxes[i] = bucket[-1]
+        self._tree_add(i, 1)
+
+        if len(bucket) > 2 * self.BUCKET_SIZE:
+            half = len(bucket) // 2
+            self._buckets[i:i + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[i:i + 1] = [bucket[half - 1], bucket[-1]]
+            self._rebuild_tree()
+
+    def _remove(self, key):
+        i = bisect_left(self._maxes, key)
+        bucket = self._buckets[i]
+        del bucket[bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+            self._rebuild_tree()
+
+    def update(self, uid, xp):
+        old = self._xp.get(uid)
+        if old == xp:
+            return
+        if old is not None:
+            self._remove((-old, uid))
+        self._insert((-xp, uid))
+        self._xp[uid] = xp
+
+    def remove(self, uid):
+        xp = self._xp.pop(uid, None)
+        if xp is not None:
+            self._remove((-xp, uid))
+
+    def rank(self, uid):
+        """1-based position of a user, or None if the user has no XP entry"""
+        xp = self._xp.get(uid)
+        if xp is None:
+            return None
+        key = (-xp, uid)
+        i = bisect_left(self._maxes, key)
+        return self._prefix(i) + bisect_left(self._buckets[i], key) + 1
+
+    def page(self, offset, limit):
+        """(uid, xp) pairs for positions offset .. offset + limit - 1"""
+        result = []
+        if offset >= len(self._xp) or limit <= 0:
+            return result
+        i, j = self._locate(offset)
+        while i < len(self._buckets) and len(result) < limit:
+            for neg_xp, uid in self._buckets[i][j:j + limit - len(result)]:
+                result.append((uid, -neg_xp))
+            i, j = i + 1, 0
+        return result
+
+    def top(self, k):
+        return self.page(0, k)
+
+class CooldownTracker:
+    """Last XP award per (guild, user) as time.monotonic() floats.
+
+    Replaces parsing and re-serializing the ISO last_message string on every
+    message. The wall-clock last_message field is only written back when the
+    entry is flushed, and entries past the cooldown are dropped in bulk.
+    """
+
+    def __init__(self, cooldown=XP_COOLDOWN):
+        self.cooldown = cooldown
+        self._last = {}
+        self._started = time.monotonic()
+
+    def __len__(self):
+        return len(self._last)
+
+    def seed(self, key, last_message, now):
+        """Import a persisted ISO timestamp; only awards from before startup can still be cooling down"""
+        if now - self._started >= self.cooldown or key in self._last or not last_message:
+            return
+        try:
+            age = (datetime.datetime.now() - datetime.datetime.fromisoformat(last_message)).total_seconds()
+        except ValueError:
+            return
+        if age < self.cooldown:
+            self._last[key] = now - max(age, 0)
+
+    def ready(self, key, now):
+        last = self._last.get(key)
+        return last is None or now - last >= self.cooldown
+
+    def hit(self, key, now):
+        self._last[key] = now
+
+    def last_award_iso(self, key):
+        last = self._last.get(key)
+        if last is None:
+            return None
+        elapsed = time.monotonic() - last
+        return (datetime.datetime.now() - datetime.timedelta(seconds=elapsed)).isoformat()
+
+    def expire(self, keep=()):
+        """Drop every entry whose cooldown has run out, except keys in keep"""
+        cutoff = time.monotonic() - self.cooldown
+        before = len(self._last)
+        self._last = {key: last for key, last in self._last.items() if last > cutoff or key in keep}
+        return before - len(self._last)
+
+class VoiceSessions:
+    """Members currently earning voice XP, keyed by (guild id, user id).
+
+    Kept up to date from on_voice_state_update so a voice tick only walks
+    the members that are actually in voice.
+    """
+
+    def __init__(self):
+        self._members = {}
+
+    def __len__(self):
+        return len(self._members)
+
+    @staticmethod
+    def eligible(member, state):
+        """In voice, not a bot, not (self-)deafened and not in the AFK channel"""
+        if member.bot or state is None or state.channel is None:
+            return False
+        if state.self_deaf or state.deaf:
+            return False
+        return state.channel != member.guild.afk_channel
+
+    def update(self, member, state):
+        key = (str(member.guild.id), str(member.id))
+        if self.eligible(member, state):
+            self._members.setdefault(key, time.monotonic())
+        else:
+            self._members.pop(key, None)
+
+    def rebuild(self, guilds):
+        """Re-scan the voice channels, e.g. after (re)connecting"""
+        self._members.clear()
+        for guild in guilds:
+            for channel in guild.voice_channels + guild.stage_channels:
+                for member in channel.members:
+                    self.update(member, member.voice)
+
+    def keys(self):
+        return list(self._members)
+
+class LevelUpQueue:
+    """Bounded queue of level-up side effects served by a worker pool.
+
+    Jobs are keyed by (guild, user): a level-up for a user who is already
+    queued only raises the target level of the pending job, so a burst of
+    level-ups costs one embed and one role pass.
+    """
+
+    def __init__(self, handler, workers=LEVELUP_WORKERS, maxsize=LEVELUP_QUEUE_SIZE):
+        self.handler = handler
+        self.worker_count = workers
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self._pending = {}
+        self._workers = []
+        self._closing = False
+
+        # Counters
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.processed = 0
+        self.failed = 0
+        self.last_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.total_latency_ms = 0.0
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    def start(self):
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    def push(self, member, channel, from_level, to_level, xp):
+        key = (member.guild.id, member.id)
+        job = self._pending.get(key)
+        if job is not None:
+            job["channel"] = channel or job["channel"]
+            job["to_level"] = max(job["to_level"], to_level)
+            job["xp"] = xp
+            self.coalesced += 1
+            return True
+
+        if self._closing:
+            self.dropped += 1
+            return False
+
+        job = {
+            "member": member,
+            "channel": channel,
+            "from_level": from_level,
+            "to_level": to_level,
+            "xp": xp,
+            "queued_at": time.perf_counter()
+        }
+        try:
+            self._queue.put_nowait(key)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self._pending[key] = job
+        self.enqueued += 1
+        return True
+
+    async def _worker(self):
+        while True:
+            key = await self._queue.get()
+            job = self._pending.pop(key, None)
+            try:
+                if job is not None:
+                    await self.handler(job)
+                    self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Error handling level up: {e}")
+            finally:
+                if job is not None:
+                    latency_ms = (time.perf_counter() - job["queued_at"]) * 1000
+                    self.last_latency_ms = latency_ms
+                    self.total_latency_ms += latency_ms
+                    self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+                self._queue.task_done()
+
+    async def close(self, timeout=10):
+        """Stop accepting new jobs, drain the queue, then stop the workers"""
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"Level-up queue not drained, {self.depth} jobs left")
+        for worker in self._workers:
+            worker.cancel()
+
+    def stats(self):
+        done = self.processed + self.failed
+        return {
+            "depth": self.depth,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "processed": self.processed,
+            "failed": self.failed,
+            "last_latency_ms": round(self.last_latency_ms, 2),
+            "avg_latency_ms": round(self.total_latency_ms / done, 2) if done else 0.0,
+            "max_latency_ms": round(self.max_latency_ms, 2)
+        }
+
+class LeaderboardCache:
+    """Rendered leaderboard page embeds and running totals per guild.
+
+    The XP path reports every change through record(), which keeps the
+    totals current and drops only the cached pages whose positions moved:
+    a user going from old_key to new_key shifts exactly the positions
+    between those two keys in the (-xp, uid) order.
+    """
+
+    def __init__(self, page_size=LEADERBOARD_PAGE_SIZE, max_pages=LEADERBOARD_CACHED_PAGES):
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._guilds = {}
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def has_guild(self, gid):
+        return gid in self._guilds
+
+    def init_guild(self, gid, totals):
+        self._guilds[gid] = {"totals": list(totals), "pages": {}, "version": 0}
+
+    def drop_guild(self, gid):
+        self._guilds.pop(gid, None)
+
+    def totals(self, gid):
+        return tuple(self._guilds[gid]["totals"])
+
+    def version(self, gid):
+        return self._guilds[gid]["version"]
+
+    def get_page(self, gid, page):
+        cached = self._guilds[gid]["pages"].get(page)
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return cached["embed"]
+
+    def put_page(self, gid, page, embed, rows, version):
+        """Cache a rendered page unless an update arrived while it was fetched"""
+        cache = self._guilds.get(gid)
+        if cache is None or cache["version"] != version:
+            return
+        pages = cache["pages"]
+        if len(pages) >= self.max_pages:
+            del pages[next(iter(pages))]
+        pages[page] = {
+            "embed": embed,
+            "first_key": (-rows[0][1].get("xp", 0), rows[0][0]),
+            "last_key": (-rows[-1][1].get("xp", 0), rows[-1][0]),
+            "full": len(rows) >= self.page_size
+        }
+
+    def record(self, gid, uid, old_xp, new_xp, messages=0, new_user=False):
+        cache = self._guilds.get(gid)
+        if cache is None:
+            return
+
+        totals = cache["totals"]
+        totals[0] += 1 if new_user else 0
+        totals[1] += new_xp - (old_xp or 0)
+        totals[2] += messages
+
+        if old_xp == new_xp and not new_user:
+            return
+
+        new_key = (-new_xp, uid)
+        old_key = (float("inf"), uid) if new_user else (-old_xp, uid)
+        low, high = min(old_key, new_key), max(old_key, new_key)
+
+        cache["version"] += 1
+        pages = cache["pages"]
+        for page, cached in list(pages.items()):
+            last_key = cached["last_key"] if cached["full"] else (float("inf"),)
+            if cached["first_key"] <= high and last_key >= low:
+                del pages[page]
+                self.invalidations += 1
+
+    def stats(self):
+        return {
+            "guilds": len(self._guilds),
+            "pages": sum(len(cache["pages"]) for cache in self._guilds.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations
+        }
+
+class LeaderboardView(View):
+    def __init__(self, cog, guild, page, pages):
+        super().__init__(timeout=120)
+        self.cog = cog
+        self.guild = guild
+        self.page = page
+        self.pages = pages
+        self.update_buttons()
+
+    def update_buttons(self):
+        self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= self.pages - 1
+
+    async def show(self, interaction, page):
+        embed, self.page, self.pages = await self.cog.leaderboard_embed(self.guild, page)
+        self.update_buttons()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="◀️ Zurück", style=discord.ButtonStyle.blurple)
+    async def previous_page(self, interaction: discord.Interaction, button: Button):
+        await self.show(interaction, self.page - 1)
+
+    @discord.ui.button(label="Weiter ▶️", style=discord.ButtonStyle.blurple)
+    async def next_page(self, interaction: discord.Interaction, button: Button):
+        await self.show(interaction, self.page + 1)
+
+class SeasonResetError(Exception):
+    """A season reset that failed; archived tells whether the standings were archived (and reset) already"""
+
+    def __init__(self, archived, season=None):
+        super().__init__("season archived, but the reset was not saved" if archived else "season could not be archived")
+        self.archived = archived
+        self.season = season
+
+class SeasonResetView(View):
+    """Asks before /seasonreset archives and wipes a guild's standings"""
+
+    def __init__(self, cog, interaction):
+        super().__init__(timeout=30)
+        self.cog = cog
+        self.interaction = interaction
+
+    @discord.ui.button(label="Bestätigen", style=discord.ButtonStyle.green)
+    async def confirm(self, interaction: discord.Interaction, button: Button):
+        if interaction.user != self.interaction.user:
+            await interaction.response.send_message("Du kannst das nicht bestätigen!", ephemeral=True)
+            return
+        self.stop()
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        try:
+            season, users = await self.cog.reset_season(str(interaction.guild.id))
+        except SeasonResetError as e:
+            print(f"Error resetting level season: {e} ({e.__cause__})")
+            if e.archived:
+                text = f"⚠️ Saison **{e.season}** wurde archiviert, aber das Zurücksetzen der XP konnte nicht gespeichert werden. Bitte prüfe die Level-Daten."
+            else:
+                text = "❌ Die Saison konnte nicht archiviert werden. Es wurde nichts zurückgesetzt."
+            await interaction.followup.send(text, ephemeral=True)
+            return
+        except Exception as e:
+            print(f"Unexpected error in season reset: {e}")
+            await interaction.followup.send("❌ Ein unerwarteter Fehler ist aufgetreten.", ephemeral=True)
+            return
+
+        embed = discord.Embed(
+            title="🏁 Saison beendet",
+            description=f"Saison **{season}** wurde mit **{users}** Nutzern archiviert.\nAlle XP und Level wurden zurückgesetzt!",
+            color=VANTAX_COLOR
+        )
+        embed.set_footer(text=VANTAX_FOOTER)
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @discord.ui.button(label="Abbrechen", style=discord.ButtonStyle.red)
+    async def cancel(self, interaction: discord.Interaction, button: Button):
+        if interaction.user != self.interaction.user:
+            await interaction.response.send_message("Du kannst das nicht abbrechen!", ephemeral=True)
+            return
+        await interaction.response.send_message("❌ Aktion abgebrochen.", ephemeral=True)
+        self.stop()
+
+class SeasonArchive:
+    """Final standings of past seasons, one row per (guild, season, rank).
+
+    archive() runs in a worker thread on its own connection; the read
+    queries use a second connection on the event loop and are served by
+    the primary key (guild_id, season, rank).
+    """
+
+    def __init__(self, path=LEVEL_SEASON_DB):
+        self.path = path
+        self.conn = self._connect(path)
+        self._writer = self._connect(path)
+        self._writer_lock = threading.Lock()
+
+    @staticmethod
+    def _connect(path):
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS season_state (
+                guild_id TEXT PRIMARY KEY,
+                season INTEGER NOT NULL,
+                started_at TEXT NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS seasons (
+                guild_id TEXT NOT NULL,
+                season INTEGER NOT NULL,
+                started_at TEXT NOT NULL,
+                ended_at TEXT NOT NULL,
+                users INTEGER NOT NULL,
+                total_xp INTEGER NOT NULL,
+                total_messages INTEGER NOT NULL,
+                PRIMARY KEY (guild_id, season)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS season_standings (
+                guild_id TEXT NOT NULL,
+                season INTEGER NOT NULL,
+                rank INTEGER NOT NULL,
+                user_id TEXT NOT NULL,
+                xp INTEGER NOT NULL,
+                level INTEGER NOT NULL,
+                messages INTEGER NOT NULL,
+                PRIMARY KEY (guild_id, season, rank)
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_season_standings_user ON season_standings (guild_id, season, user_id)")
+        conn.commit()
+        return conn
+
+    def _state(self, gid):
+        row = self._writer.execute("SELECT season, started_at FROM season_state WHERE guild_id = ?", (gid,)).fetchone()
+        if row is None:
+            row = (1, datetime.datetime.now().isoformat())
+            self._writer.execute("INSERT INTO season_state (guild_id, season, started_at) VALUES (?, ?, ?)", (gid,) + row)
+        return row
+
+    def current(self, gid):
+        """(season number, started_at) of the running season; blocking, call via to_thread"""
+        with self._writer_lock, self._writer:
+            return self._state(gid)
+
+    def archive(self, gid, rows):
+        """Store (uid, xp, level, messages) rows as the final standings and start the next season.
+
+        Blocking, call via to_thread. Returns (archived season, number of users).
+        """
+        rows = sorted(rows, key=lambda row: (-row[1], row[0]))
+        levels = levels_from_xp(row[1] for row in rows)
+
+        with self._writer_lock, self._writer:
+            season, started_at = self._state(gid)
+            ended_at = datetime.datetime.now().isoformat()
+            self._writer.executemany(
+                "INSERT INTO season_standings (guild_id, season, rank, user_id, xp, level, messages) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((gid, season, rank, uid, xp, level, messages) for rank, ((uid, xp, _, messages), level) in enumerate(zip(rows, levels), start=1))
+            )
+            self._writer.execute(
+                "INSERT INTO seasons (guild_id, season, started_at, ended_at, users, total_xp, total_messages) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (gid, season, started_at, ended_at, len(rows), sum(row[1] for row in rows), sum(row[3] for row in rows))
+            )
+            self._writer.execute("UPDATE season_state SET season = ?, started_at = ? WHERE guild_id = ?", (season + 1, ended_at, gid))
+        return season, len(rows)
+
+    def seasons(self, gid, limit=10):
+        rows = self.conn.execute(
+            "SELECT season, started_at, ended_at, users, total_xp, total_messages FROM seasons "
+            "WHERE guild_id = ? ORDER BY season DESC LIMIT ?",
+            (gid, limit)
+        ).fetchall()
+        keys = ("season", "started_at", "ended_at", "users", "total_xp", "total_messages")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def page(self, gid, season, offset, limit):
+        """(rank, uid, xp, level, messages) rows of an archived season"""
+        return self.conn.execute(
+            "SELECT rank, user_id, xp, level, messages FROM season_standings "
+            "WHERE guild_id = ? AND season = ? AND rank > ? ORDER BY rank LIMIT ?",
+            (gid, season, offset, limit)
+        ).fetchall()
+
+    def rank(self, gid, season, uid):
+        row = self.conn.execute(
+            "SELECT rank FROM season_standings WHERE guild_id = ? AND season = ? AND user_id = ?",
+            (gid, season, uid)
+        ).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self.conn.close()
+        self._writer.close()
+
+class LevelStore:
+    """Write-behind base for the level backends.
+
+    XP updates only mark (guild, user) entries as dirty; flush() hands the
+    dirty keys to the backend's _write() once FLUSH_INTERVAL has passed or
+    FLUSH_THRESHOLD entries are pending. Subclasses implement the storage.
+    """
+
+    def __init__(self, interval=FLUSH_INTERVAL, threshold=FLUSH_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self._dirty = set()
+        self._flush_wanted = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self.cooldowns = CooldownTracker()
+
+        # Counters
+        self.flush_count = 0
+        self.flushed_entries = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    @property
+    def pending(self):
+        return len(self._dirty)
+
+    @property
+    def write_lock(self):
+        """Held by every write; while it is held no flush is in flight"""
+        return self._lock
+
+    def mark_dirty(self, gid, uid):
+        self._dirty.add((gid, uid))
+        if len(self._dirty) >= self.threshold:
+            self._flush_wanted.set()
+
+    async def wait_for_flush(self):
+        """Sleep until the interval elapses or the dirty threshold is hit"""
+        try:
+            await asyncio.wait_for(self._flush_wanted.wait(), timeout=self.interval)
+        except asyncio.TimeoutError:
+            pass
+        self._flush_wanted.clear()
+
+    async def flush(self):
+        """Persist all pending entries. Shielded so a cancelled caller can't interrupt a write."""
+        return await asyncio.shield(self._flush())
+
+    async def _flush(self):
+        async with self._lock:
+            if not self._dirty:
+                return 0
+
+            keys, self._dirty = self._dirty, set()
+            started = time.perf_counter()
+            self._stamp_last_message(keys)
+            try:
+                await self._write(keys)
+            except Exception as e:
+                print(f"Error flushing level data: {e}")
+                self.failed_flushes += 1
+                self._dirty |= keys
+                return 0
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flush_count += 1
+            self.flushed_entries += len(keys)
+            self.last_flush_ms = elapsed_ms
+            self.total_flush_ms += elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            return len(keys)
+
+    def _stamp_last_message(self, keys):
+        """Copy the in-memory award times into last_message for persisting"""
+        for gid, uid in keys:
+            last_message = self.cooldowns.last_award_iso((gid, uid))
+            if last_message is not None:
+                entry = self.get(gid, uid)
+                if entry is not None:
+                    entry["last_message"] = last_message
+
+    def expire_cooldowns(self):
+        return self.cooldowns.expire(keep=self._dirty)
+
+    def get(self, gid, uid):
+        raise NotImplementedError
+
+    async def _write(self, keys):
+        raise NotImplementedError
+
+    def current_totals(self, gid):
+        """(users, total xp, total messages) including unflushed updates, without awaiting;
+        call with write_lock held"""
+        raise NotImplementedError
+
+    async def reset_guild(self, gid, archive):
+        """Archive a guild's standings into a SeasonArchive and reset all its counters"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return {
+            "pending": self.pending,
+            "flushes": self.flush_count,
+            "flushed_entries": self.flushed_entries,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "avg_flush_ms": round(self.total_flush_ms / self.flush_count, 2) if self.flush_count else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 2)
+        }
+
+class JsonLevelStore(LevelStore):
+    """Whole level tree in memory, persisted to leveldata.json.
+
+    Every entry is also kept as its JSON text. _write() re-encodes only
+    the dirty entries on the event loop and assembles the file from those
+    texts in a worker thread, so the loop does O(dirty) work per flush and
+    the live dict is never read off-loop.
+    """
+
+    def __init__(self, path=LEVEL_FILE, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.data = load_data(path)
+        # {gid: {uid: JSON text}} as last written; only changed under self._lock
+        self._encoded = {gid: {uid: json.dumps(entry) for uid, entry in users.items()} for gid, users in self.data.items()}
+        # Per-guild RankIndex, built on the first rank/leaderboard query
+        self._ranks = {}
+
+    def get(self, gid, uid):
+        return self.data.get(gid, {}).get(uid)
+
+    def ensure(self, gid, uid):
+        """Return the entry for a user, creating it if needed"""
+        users = self.data.setdefault(gid, {})
+        entry = users.get(uid)
+        if entry is None:
+            entry = users[uid] = new_user_entry()
+        return entry
+
+    def mark_dirty(self, gid, uid):
+        super().mark_dirty(gid, uid)
+
+        index = self._ranks.get(gid)
+        if index is not None:
+            entry = self.get(gid, uid)
+            if entry is None:
+                index.remove(uid)
+            else:
+                index.update(uid, entry.get("xp", 0))
+
+    def rank_index(self, gid):
+        index = self._ranks.get(gid)
+        if index is None:
+            users = self.data.get(gid, {})
+            index = self._ranks[gid] = RankIndex((uid, entry.get("xp", 0)) for uid, entry in users.items())
+        return index
+
+    async def count(self, gid):
+        return len(self.data.get(gid, {}))
+
+    async def totals(self, gid):
+        return self.current_totals(gid)
+
+    def current_totals(self, gid):
+        """(users, total xp, total messages) for a guild"""
+        users = self.data.get(gid, {})
+        total_xp = sum(entry.get("xp", 0) for entry in users.values())
+        total_messages = sum(entry.get("messages", 0) for entry in users.values())
+        return len(users), total_xp, total_messages
+
+    async def rank(self, gid, uid):
+        return self.rank_index(gid).rank(uid)
+
+    async def page(self, gid, offset, limit):
+        """Leaderboard slice as (uid, entry) pairs, highest XP first"""
+        users = self.data.get(gid, {})
+        return [(uid, users[uid]) for uid, _ in self.rank_index(gid).page(offset, limit)]
+
+    async def top(self, gid, limit):
+        return await self.page(gid, 0, limit)
+
+    async def _write(self, keys):
+        for gid, uid in keys:
+            entry = self.get(gid, uid)
+            if entry is None:
+                self._encoded.get(gid, {}).pop(uid, None)
+            else:
+                self._encoded.setdefault(gid, {})[uid] = json.dumps(entry)
+        await asyncio.to_thread(save_encoded_data, self._encoded, self.path)
+
+    async def reset_guild(self, gid, archive):
+        async with self._lock:
+            # Detach the whole guild in O(1); new XP starts a fresh dict right away
+            users = self.data.pop(gid, {})
+            encoded = self._encoded.pop(gid, {})
+            self._ranks.pop(gid, None)
+            dirty = {key for key in self._dirty if key[0] == gid}
+            self._dirty -= dirty
+
+            rows = ((uid, entry.get("xp", 0), entry.get("level", 1), entry.get("messages", 0)) for uid, entry in users.items())
+            try:
+                result = await asyncio.to_thread(archive.archive, gid, rows)
+            except Exception as e:
+                self._restore_guild(gid, users, encoded, dirty)
+                raise SeasonResetError(False) from e
+            try:
+                await asyncio.to_thread(save_encoded_data, self._encoded, self.path)
+            except Exception as e:
+                # The reset stands in memory; the next flush rewrites the whole file
+                raise SeasonResetError(True, result[0]) from e
+        return result
+
+    def _restore_guild(self, gid, users, encoded, dirty):
+        """Put a detached guild back after a failed archive, keeping XP earned meanwhile"""
+        for uid, entry in self.data.pop(gid, {}).items():
+            old = users.get(uid)
+            if old is None:
+                users[uid] = entry
+            else:
+                old["xp"] = old.get("xp", 0) + entry.get("xp", 0)
+                old["messages"] = old.get("messages", 0) + entry.get("messages", 0)
+            dirty.add((gid, uid))
+        self.data[gid] = users
+        self._encoded[gid] = encoded
+        self._ranks.pop(gid, None)
+        self._dirty |= dirty
+
+class SqliteLevelStore(LevelStore):
+    """Levels in an indexed SQLite table with a bounded LRU cache in front.
+
+    Only recently active users are held in memory. Dirty rows are upserted in
+    a worker thread on a dedicated writer connection; rank and leaderboard
+    queries run on the (guild_id, xp DESC) index after pending rows are flushed.
+    """
+
+    COLUMNS = ("xp", "level", "messages", "last_message", "streak")
+
+    def __init__(self, path=LEVEL_DB, json_path=LEVEL_FILE, cache_size=LEVEL_CACHE_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.conn = connect_level_db(path)
+        self._writer = connect_level_db(path)
+        # Guilds being archived; lookups skip the table so old rows can't come back
+        self._resetting = set()
+
+        # One-shot migration of an existing leveldata.json into an empty table
+        if json_path and os.path.isfile(json_path) and self.conn.execute("SELECT 1 FROM levels LIMIT 1").fetchone() is None:
+            imported = import_level_json(json_path, self._writer)
+            if imported:
+                print(f"Imported {imported} level entries from {json_path} into {path}")
+
+    def _row_to_entry(self, row):
+        return dict(zip(self.COLUMNS, row))
+
+    def get(self, gid, uid):
+        key = (gid, uid)
+        entry = self._cache.get(key)
+        if entry is not None:
+            self._cache.move_to_end(key)
+            return entry
+        if gid in self._resetting:
+            return None
+
+        row = self.conn.execute(
+            "SELECT xp, level, messages, last_message, streak FROM levels WHERE guild_id = ? AND user_id = ?",
+            (gid, uid)
+        ).fetchone()
+        if row is None:
+            return None
+        entry = self._cache[key] = self._row_to_entry(row)
+        return entry
+
+    def ensure(self, gid, uid):
+        entry = self.get(gid, uid)
+        if entry is None:
+            entry = self._cache[(gid, uid)] = new_user_entry()
+        return entry
+
+    def _trim_cache(self):
+        """Evict least recently used entries that have nothing left to write"""
+        if len(self._cache) <= self.cache_size:
+            return
+        for key in list(self._cache):
+            if len(self._cache) <= self.cache_size:
+                break
+            if key not in self._dirty:
+                del self._cache[key]
+
+    async def _write(self, keys):
+        rows = []
+        for gid, uid in keys:
+            entry = self._cache.get((gid, uid))
+            if entry is not None:
+                rows.append((gid, uid) + tuple(entry.get(column) for column in self.COLUMNS))
+        await asyncio.to_thread(self._write_rows, rows)
+        self._trim_cache()
+
+    def _write_rows(self, rows):
+        with self._writer:
+            self._writer.executemany(UPSERT_LEVEL_SQL, rows)
+
+    async def reset_guild(self, gid, archive):
+        await self.flush()
+        async with self._lock:
+            # Updates since that flush still belong to the ending season
+            keys = {key for key in self._dirty if key[0] == gid}
+            if keys:
+                self._dirty -= keys
+                self._stamp_last_message(keys)
+                await self._write(keys)
+
+            self._resetting.add(gid)
+            for key in [key for key in self._cache if key[0] == gid]:
+                del self._cache[key]
+            self._dirty = {key for key in self._dirty if key[0] != gid}
+            try:
+                return await asyncio.to_thread(self._archive_and_delete, gid, archive)
+            finally:
+                self._resetting.discard(gid)
+
+    def _archive_and_delete(self, gid, archive):
+        rows = self._writer.execute(
+            "SELECT user_id, xp, level, messages FROM levels WHERE guild_id = ?", (gid,)
+        ).fetchall()
+        try:
+            result = archive.archive(gid, rows)
+        except Exception as e:
+            raise SeasonResetError(False) from e
+        try:
+            with self._writer:
+                self._writer.execute("DELETE FROM levels WHERE guild_id = ?", (gid,))
+        except Exception as e:
+            raise SeasonResetError(True, result[0]) from e
+        return result
+
+    async def _sync(self):
+        """Make the table reflect pending in-memory updates before querying it"""
+        if self._dirty:
+            await self.flush()
+
+    async def count(self, gid):
+        await self._sync()
+        return self.conn.execute("SELECT COUNT(*) FROM levels WHERE guild_id = ?", (gid,)).fetchone()[0]
+
+    async def totals(self, gid):
+        await self._sync()
+        return tuple(self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(xp), 0), COALESCE(SUM(messages), 0) FROM levels WHERE guild_id = ?",
+            (gid,)
+        ).fetchone())
+
+    def current_totals(self, gid):
+        """Table totals corrected by the pending rows; with write_lock held the table can't change meanwhile"""
+        users, total_xp, total_messages = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(xp), 0), COALESCE(SUM(messages), 0) FROM levels WHERE guild_id = ?",
+            (gid,)
+        ).fetchone()
+        pending = {key[1]: self._cache[key] for key in self._dirty if key[0] == gid and key in self._cache}
+        uids = list(pending)
+        for start in range(0, len(uids), 500):
+            chunk = uids[start:start + 500]
+            stored = dict(
+                (uid, (xp, messages)) for uid, xp, messages in self.conn.execute(
+                    f"SELECT user_id, xp, messages FROM levels WHERE guild_id = ? AND user_id IN ({', '.join('?' * len(chunk))})",
+                    (gid, *chunk)
+                )
+            )
+            for uid in chunk:
+                entry = pending[uid]
+                xp, messages = stored.get(uid, (0, 0))
+                users += uid not in stored
+                total_xp += entry.get("xp", 0) - xp
+                total_messages += entry.get("messages", 0) - messages
+        return users, total_xp, total_messages
+
+    async def rank(self, gid, uid):
+        await self._sync()
+        row = self.conn.execute("SELECT xp FROM levels WHERE guild_id = ? AND user_id = ?", (gid, uid)).fetchone()
+        if row is None:
+            return None
+        xp = row[0]
+        ahead = self.conn.execute(
+            "SELECT COUNT(*) FROM levels WHERE guild_id = ? AND (xp > ? OR (xp = ? AND user_id < ?))",
+            (gid, xp, xp, uid)
+        ).fetchone()[0]
+        return ahead + 1
+
+    async def page(self, gid, offset, limit):
+        await self._sync()
+        rows = self.conn.execute(
+            "SELECT user_id, xp, level, messages, last_message, streak FROM levels "
+            "WHERE guild_id = ? ORDER BY xp DESC, user_id LIMIT ? OFFSET ?",
+            (gid, limit, offset)
+        ).fetchall()
+        return [(row[0], self._row_to_entry(row[1:])) for row in rows]
+
+    async def top(self, gid, limit):
+        return await self.page(gid, 0, limit)
+
+    def close(self):
+        self.conn.close()
+        self._writer.close()
+
+def create_level_store():
+    """Pick the level backend from LEVEL_BACKEND ("json" or "sqlite")"""
+    if LEVEL_BACKEND == "sqlite":
+        return SqliteLevelStore()
+    if LEVEL_BACKEND != "json":
+        print(f"Unknown LEVEL_BACKEND '{LEVEL_BACKEND}', falling back to json")
+    return JsonLevelStore()
 
 class Level(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.data = load_data()
+        self.store = create_level_store()
+        self.voice = VoiceSessions()
+        self.leaderboards = LeaderboardCache()
+        self.seasons = SeasonArchive()
+        self.level_ups = LevelUpQueue(self.announce_level_up)
+        self.level_ups.start()
+        self.flush_task = self.bot.loop.create_task(self.flush_loop())
+        self.voice_task = self.bot.loop.create_task(self.voice_loop())
+        self.season_task = self.bot.loop.create_task(self.season_loop()) if LEVEL_SEASONS == "monthly" else None
+
+    async def cog_unload(self):
+        """Flush pending XP; also runs on shutdown since Bot.close() removes all cogs"""
+        self.flush_task.cancel()
+        self.voice_task.cancel()
+        if self.season_task:
+            self.season_task.cancel()
+        await self.level_ups.close()
+        await self.store.flush()
+        self.store.close()
+        self.seasons.close()
+
+    async def flush_loop(self):
+        """Persist dirty level entries in the background"""
+        await self.bot.wait_until_ready()
+
+        while not self.bot.is_closed():
+            try:
+                await self.store.wait_for_flush()
+                await self.store.flush()
+                self.store.expire_cooldowns()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in level flush loop: {e}")
+                await asyncio.sleep(5)
+
+    async def voice_loop(self):
+        """Award voice XP to everyone in voice once per VOICE_TICK"""
+        await self.bot.wait_until_ready()
+
+        while not self.bot.is_closed():
+            try:
+                await asyncio.sleep(VOICE_TICK)
+                await self.award_voice_xp()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in voice XP loop: {e}")
+
+    async def award_voice_xp(self):
+        """One batch over all active voice sessions, followed by a single flush"""
+        xp_reward = XP_REWARDS["voice_minute"] * VOICE_TICK // 60
+        level_ups = []
+
+        for gid, uid in self.voice.keys():
+            user_data = self.store.get(gid, uid)
+            new_user = user_data is None
+            if new_user:
+                user_data = self.store.ensure(gid, uid)
+            old_xp = user_data["xp"]
+            user_data["xp"] += xp_reward
+            current_level = user_data["level"]
+            new_level = get_level_from_xp(user_data["xp"])
+            if new_level > current_level:
+                user_data["level"] = new_level
+                level_ups.append((gid, uid, current_level, new_level, user_data["xp"]))
+            self.store.mark_dirty(gid, uid)
+            self.leaderboards.record(gid, uid, old_xp, user_data["xp"], new_user=new_user)
+
+        await self.store.flush()
+
+        for gid, uid, current_level, new_level, xp in level_ups:
+            guild = self.bot.get_guild(int(gid))
+            member = guild.get_member(int(uid)) if guild else None
+            if member:
+                self.level_ups.push(member, None, current_level, new_level, xp)
+
+    async def season_loop(self):
+        """Start a new season for every guild once the month changes"""
+        await self.bot.wait_until_ready()
+
+        while not self.bot.is_closed():
+            try:
+                month = datetime.datetime.now().strftime("%Y-%m")
+                for guild in self.bot.guilds:
+                    gid = str(guild.id)
+                    _, started_at = await asyncio.to_thread(self.seasons.current, gid)
+                    if started_at[:7] != month:
+                        season, users = await self.reset_season(gid)
+                        print(f"Level season {season} of guild {gid} archived ({users} users)")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in level season loop: {e}")
+            await asyncio.sleep(3600)
+
+    async def reset_season(self, gid):
+        """Archive the current standings and reset the guild; returns (season, users)"""
+        try:
+            return await self.store.reset_guild(gid, self.seasons)
+        finally:
+            self.leaderboards.drop_guild(gid)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        self.voice.rebuild(self.bot.guilds)
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        self.voice.update(member, after)
 
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -55,22 +1464,18 @@ class Level(commands.Cog):
         gid = str(message.guild.id)
         
         # Initialize user data if not exists
-        if gid not in self.data:
-            self.data[gid] = {}
-        if uid not in self.data[gid]:
-            self.data[gid][uid] = {
-                "xp": 0, 
-                "level": 1, 
-                "messages": 0,
-                "last_message": None,
-                "streak": 0
-            }
+        user_data = self.store.get(gid, uid)
+        new_user = user_data is None
+        if new_user:
+            user_data = self.store.ensure(gid, uid)
         
         # Cooldown check (prevent spam)
-        now = datetime.datetime.now()
-        last_msg = self.data[gid][uid].get("last_message")
-        if last_msg and (now - datetime.datetime.fromisoformat(last_msg)).seconds < 30:
-            return  # Skip if last message was less than 30 seconds ago
+        key = (gid, uid)
+        now = time.monotonic()
+        cooldowns = self.store.cooldowns
+        cooldowns.seed(key, user_data.get("last_message"), now)
+        if not cooldowns.ready(key, now):
+            return  # Skip if last award was less than XP_COOLDOWN seconds ago
         
         # Calculate XP reward
         xp_reward = XP_REWARDS["message"]
@@ -84,54 +1489,60 @@ class Level(commands.Cog):
             xp_reward += XP_REWARDS["long_message"]
         
         # Update user data
-        self.data[gid][uid]["xp"] += xp_reward
-        self.data[gid][uid]["messages"] += 1
-        self.data[gid][uid]["last_message"] = now.isoformat()
+        old_xp = user_data["xp"]
+        user_data["xp"] += xp_reward
+        user_data["messages"] = user_data.get("messages", 0) + 1
+        cooldowns.hit(key, now)  # last_message is written on flush
         
         # Check for level up
-        current_level = self.data[gid][uid]["level"]
-        new_level = get_level_from_xp(self.data[gid][uid]["xp"])
+        current_level = user_data["level"]
+        new_level = get_level_from_xp(user_data["xp"])
         
         if new_level > current_level:
-            self.data[gid][uid]["level"] = new_level
+            user_data["level"] = new_level
             
+            # Embed, role rewards and DMs run on the level-up workers
+            self.level_ups.push(message.author, message.channel, current_level, new_level, user_data["xp"])
+        
+        self.store.mark_dirty(gid, uid)
+        self.leaderboards.record(gid, uid, old_xp, user_data["xp"], messages=1, new_user=new_user)
+
+    async def announce_level_up(self, job):
+        """Level-up embed and role rewards, run by the LevelUpQueue workers"""
+        member = job["member"]
+        from_level = job["from_level"]
+        new_level = job["to_level"]
+
+        if job["channel"] is not None:
             # Create level up embed
             embed = discord.Embed(
                 title="🎉 LEVEL UP! 🎉",
-                description=f"**{message.author.mention} ist jetzt Level {new_level}!**",
+                description=f"**{member.mention} ist jetzt Level {new_level}!**",
                 color=discord.Color.gold()
             )
             
             # Add level up rewards/info
             embed.add_field(name="🎯 Neues Level", value=f"Level {new_level}", inline=True)
-            embed.add_field(name="⭐ Gesamt XP", value=f"{self.data[gid][uid]['xp']} XP", inline=True)
-            embed.add_field(name="📈 XP für nächstes Level", value=f"{get_xp_for_level(new_level + 1)} XP", inline=True)
+            embed.add_field(name="⭐ Gesamt XP", value=f"{job['xp']} XP", inline=True)
+            embed.add_field(name="📈 XP für nächstes Level", value=f"{LEVEL_TABLE.xp_for_level(new_level + 1)} XP", inline=True)
             
-            # Special rewards for milestone levels
-            milestone_rewards = {
-                5: "🏅 Bronze Mitglied",
-                10: "🥈 Silber Mitglied", 
-                25: "🥇 Gold Mitglied",
-                50: "💎 Diamant Mitglied",
-                100: "👑 Legendär Mitglied"
-            }
-            
-            if new_level in milestone_rewards:
+            # Highest milestone reached with this (possibly coalesced) level-up
+            milestones = [level for level in MILESTONE_REWARDS if from_level < level <= new_level]
+            if milestones:
                 embed.add_field(
                     name="🎁 Meilenstein-Belohnung",
-                    value=f"**{milestone_rewards[new_level]}**",
+                    value=f"**{MILESTONE_REWARDS[max(milestones)]}**",
                     inline=False
                 )
             
-            embed.set_thumbnail(url=message.author.display_avatar.url)
+            embed.set_thumbnail(url=member.display_avatar.url)
             embed.set_footer(text=VANTAX_FOOTER)
             
-            await message.channel.send(embed=embed)
-            
-            # Try to give role reward if configured
-            await self.give_level_role(message.guild, message.author, new_level)
+            await job["channel"].send(embed=embed)
         
-        save_data(self.data)
+        # Try to give role rewards if configured, including levels skipped by coalescing
+        for level in range(from_level + 1, new_level + 1):
+            await self.give_level_role(member.guild, member, level)
 
     async def give_level_role(self, guild, member, level):
         """Give role rewards based on level (if configured)"""
@@ -157,13 +1568,13 @@ class Level(commands.Cog):
         uid = str(user.id)
         gid = str(interaction.guild.id)
         
-        user_data = self.data.get(gid, {}).get(uid, {"xp": 0, "level": 1, "messages": 0})
+        user_data = self.store.get(gid, uid) or {"xp": 0, "level": 1, "messages": 0}
         
         # Calculate progress to next level
         current_level = user_data["level"]
         current_xp = user_data["xp"]
-        xp_needed = get_xp_for_level(current_level + 1)
-        xp_for_current = get_xp_for_level(current_level)
+        xp_needed = LEVEL_TABLE.xp_for_level(current_level + 1)
+        xp_for_current = LEVEL_TABLE.xp_for_level(current_level)
         progress = min(100, ((current_xp - xp_for_current) / (xp_needed - xp_for_current)) * 100) if xp_needed > xp_for_current else 100
         
         # Create progress bar
@@ -185,55 +1596,165 @@ class Level(commands.Cog):
         )
         
         # Show rank on server
-        all_users = self.data.get(gid, {})
-        sorted_users = sorted(all_users.items(), key=lambda x: x[1].get("xp", 0), reverse=True)
-        rank = next((i + 1 for i, (uid, _) in enumerate(sorted_users) if uid == str(user.id)), len(sorted_users))
+        total_users = await self.store.count(gid)
+        rank = await self.store.rank(gid, uid) or total_users
         
-        embed.add_field(name="🥇 Rang auf Server", value=f"#{rank} von {len(sorted_users)}", inline=True)
+        embed.add_field(name="🥇 Rang auf Server", value=f"#{rank} von {total_users}", inline=True)
         
         embed.set_thumbnail(url=user.display_avatar.url)
         embed.set_footer(text=VANTAX_FOOTER)
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    async def leaderboard_embed(self, guild, page):
+        """Leaderboard page from the cache (rendered on a miss) with live server totals"""
+        gid = str(guild.id)
+        cache = self.leaderboards
+        if not cache.has_guild(gid):
+            # No flush is in flight under the lock and nothing awaits between the
+            # read and init_guild, so every later XP change reaches record()
+            async with self.store.write_lock:
+                if not cache.has_guild(gid):
+                    cache.init_guild(gid, self.store.current_totals(gid))
+        
+        total_users, total_xp, total_messages = cache.totals(gid)
+        page_size = cache.page_size
+        pages = max(1, -(-total_users // page_size))
+        page = min(max(page, 0), pages - 1)
+        
+        embed = cache.get_page(gid, page)
+        if embed is None:
+            version = cache.version(gid)
+            rows = await self.store.page(gid, page * page_size, page_size)
+            
+            if not rows:
+                embed = discord.Embed(
+                    title="🏆 VANTAX Leaderboard",
+                    description="Noch keine Daten!",
+                    color=VANTAX_COLOR
+                )
+                embed.set_thumbnail(url=guild.icon.url if guild.icon else None)
+                embed.set_footer(text=VANTAX_FOOTER)
+                return embed, page, pages
+            
+            # Create leaderboard with medals
+            medals = ["🥇", "🥈", "🥉"]
+            levels = levels_from_xp(udata.get("xp", 0) for _, udata in rows)
+            offset = page * page_size
+            
+            description = "\n".join([
+                f"**{offset+i+1}.** {medals[offset+i] if offset+i < len(medals) else '🏅'} <@{uid}> - **Level {levels[i]}** ({udata.get('xp', 0)} XP)"
+                for i, (uid, udata) in enumerate(rows)
+            ])
+            
+            embed = discord.Embed(
+                title="🏆 VANTAX Leaderboard",
+                description=description,
+                color=discord.Color.gold()
+            )
+            embed.add_field(name="📊 Server Statistiken", value="", inline=False)
+            embed.set_thumbnail(url=guild.icon.url if guild.icon else None)
+            embed.set_footer(text=VANTAX_FOOTER)
+            
+            cache.put_page(gid, page, embed, rows, version)
+        
+        # Live parts: page counter and server stats
+        embed.title = f"🏆 VANTAX Leaderboard ({page + 1}/{pages})" if pages > 1 else "🏆 VANTAX Leaderboard"
+        embed.set_field_at(0, name="📊 Server Statistiken", value=f"👥 **{total_users}** Nutzer\n💬 **{total_messages}** Nachrichten\n⭐ **{total_xp}** Gesamt XP", inline=False)
+        return embed, page, pages
+
     @app_commands.command(name="leaderboard", description="Zeigt die Top 10 XP.")
     async def leaderboard_slash(self, interaction: discord.Interaction):
+        embed, page, pages = await self.leaderboard_embed(interaction.guild, 0)
+        
+        if pages > 1:
+            view = LeaderboardView(self, interaction.guild, page, pages)
+            await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+        else:
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="seasonreset", description="Archiviert die aktuelle XP-Saison und setzt alle Level zurück.")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def season_reset_slash(self, interaction: discord.Interaction):
+        season, _ = await asyncio.to_thread(self.seasons.current, str(interaction.guild.id))
+        
+        embed = discord.Embed(
+            title="⚠️ Saison zurücksetzen?",
+            description=f"Saison **{season}** wird archiviert und **alle XP und Level** dieses Servers werden zurückgesetzt.\nDas kann nicht rückgängig gemacht werden!",
+            color=discord.Color.orange()
+        )
+        embed.set_footer(text=VANTAX_FOOTER)
+        
+        await interaction.response.send_message(embed=embed, view=SeasonResetView(self, interaction), ephemeral=True)
+
+    @app_commands.command(name="levelstats", description="Zeigt Speicher-, Cache- und Level-Up-Statistiken des Level-Systems.")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def level_stats_slash(self, interaction: discord.Interaction):
+        """Counters of the write-behind store, the leaderboard cache and the level-up queue (bot-wide)"""
+        embed = discord.Embed(
+            title="🛠️ Level-System Statistiken",
+            description=f"Backend: **{LEVEL_BACKEND}** · Werte gelten für den ganzen Bot",
+            color=VANTAX_COLOR
+        )
+        for name, stats in (
+            ("💾 Speicher", self.store.stats()),
+            ("🏆 Leaderboard-Cache", self.leaderboards.stats()),
+            ("🎉 Level-Up-Warteschlange", self.level_ups.stats())
+        ):
+            embed.add_field(name=name, value="\n".join(f"{key}: **{value}**" for key, value in stats.items()), inline=True)
+        embed.set_footer(text=VANTAX_FOOTER)
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="seasons", description="Zeigt die archivierten XP-Saisons.")
+    async def seasons_slash(self, interaction: discord.Interaction):
         gid = str(interaction.guild.id)
-        users = self.data.get(gid, {})
+        seasons = self.seasons.seasons(gid)
         
-        # Sort users by XP and get top 10
-        sorted_users = sorted(users.items(), key=lambda x: x[1].get("xp", 0), reverse=True)[:10]
+        embed = discord.Embed(title="📚 Vergangene Saisons", color=VANTAX_COLOR)
+        if not seasons:
+            embed.description = "Noch keine archivierten Saisons!"
+        for season in seasons:
+            started = datetime.datetime.fromisoformat(season["started_at"]).strftime("%d.%m.%Y")
+            ended = datetime.datetime.fromisoformat(season["ended_at"]).strftime("%d.%m.%Y")
+            embed.add_field(
+                name=f"Saison {season['season']}",
+                value=f"📅 {started} - {ended}\n👥 **{season['users']}** Nutzer\n⭐ **{season['total_xp']}** Gesamt XP",
+                inline=True
+            )
+        embed.set_footer(text=VANTAX_FOOTER)
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="seasonleaderboard", description="Zeigt die Top 10 einer vergangenen Saison.")
+    async def season_leaderboard_slash(self, interaction: discord.Interaction, season: int, seite: int = 1):
+        gid = str(interaction.guild.id)
+        offset = (max(seite, 1) - 1) * LEADERBOARD_PAGE_SIZE
+        rows = self.seasons.page(gid, season, offset, LEADERBOARD_PAGE_SIZE)
         
-        if not sorted_users:
+        if not rows:
             embed = discord.Embed(
-                title="🏆 VANTAX Leaderboard",
-                description="Noch keine Daten!",
+                title=f"🏆 Saison {season} Leaderboard",
+                description="Keine Daten für diese Saison!",
                 color=VANTAX_COLOR
             )
         else:
-            # Create leaderboard with medals
-            medals = ["🥇", "🥈", "🥉"] + ["🏅"] * 7
-            
+            medals = ["🥇", "🥈", "🥉"]
             description = "\n".join([
-                f"**{i+1}.** {medals[i]} <@{uid}> - **Level {udata.get('level', 1)}** ({udata.get('xp', 0)} XP)"
-                for i, (uid, udata) in enumerate(sorted_users)
+                f"**{rank}.** {medals[rank - 1] if rank <= len(medals) else '🏅'} <@{uid}> - **Level {level}** ({xp} XP)"
+                for rank, uid, xp, level, _ in rows
             ])
-            
             embed = discord.Embed(
-                title="🏆 VANTAX Leaderboard",
+                title=f"🏆 Saison {season} Leaderboard",
                 description=description,
                 color=discord.Color.gold()
             )
             
-            # Add server stats
-            total_xp = sum(udata.get("xp", 0) for udata in users.values())
-            total_messages = sum(udata.get("messages", 0) for udata in users.values())
-            
-            embed.add_field(name="📊 Server Statistiken", value=f"👥 **{len(users)}** Nutzer\n💬 **{total_messages}** Nachrichten\n⭐ **{total_xp}** Gesamt XP", inline=False)
+            own_rank = self.seasons.rank(gid, season, str(interaction.user.id))
+            if own_rank:
+                embed.add_field(name="🥇 Dein Rang", value=f"#{own_rank}", inline=False)
         
-        embed.set_thumbnail(url=interaction.guild.icon.url if interaction.guild.icon else None)
         embed.set_footer(text=VANTAX_FOOTER)
-        
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 async def setup(bot):
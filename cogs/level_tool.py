@@ -0,0 +1,224 @@
+"""Offline tools for the level data: recompute, export and summarize.
+
+Works on leveldata.json (streamed with iter_level_file) or on the SQLite
+backend without starting the bot. Rows are processed in fixed-size
+batches, so memory stays flat no matter how large the data is.
+
+    python -m cogs.level_tool summary
+    python -m cogs.level_tool export --format csv --output levels.csv
+    python -m cogs.level_tool leaderboard --top 25 --format ndjson
+    python -m cogs.level_tool recompute          # stop the bot first!
+"""
+import argparse
+import csv
+import heapq
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from itertools import groupby, islice
+
+from cogs.level import (
+    LEVEL_BACKEND, LEVEL_DB, LEVEL_FILE,
+    connect_level_db, iter_level_file, levels_from_xp
+)
+
+BATCH_SIZE = 5000
+
+def is_db_path(path):
+    return path.endswith((".db", ".sqlite", ".sqlite3"))
+
+def iter_level_db(path):
+    """Stream (gid, uid, entry) from the levels table, grouped by guild"""
+    conn = sqlite3.connect(path)
+    try:
+        cursor = conn.execute(
+            "SELECT guild_id, user_id, xp, level, messages, last_message, streak FROM levels ORDER BY guild_id"
+        )
+        for gid, uid, xp, level, messages, last_message, streak in cursor:
+            yield gid, uid, {"xp": xp, "level": level, "messages": messages, "last_message": last_message, "streak": streak}
+    finally:
+        conn.close()
+
+def iter_source(path):
+    return iter_level_db(path) if is_db_path(path) else iter_level_file(path)
+
+def iter_recomputed(rows, batch_size=BATCH_SIZE):
+    """Yield (gid, uid, entry, level) with levels recomputed one batch at a time"""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        levels = levels_from_xp(entry.get("xp", 0) for _, _, entry in batch)
+        for (gid, uid, entry), level in zip(batch, levels):
+            yield gid, uid, entry, level
+
+def to_record(gid, uid, entry, level):
+    return {
+        "guild_id": gid,
+        "user_id": uid,
+        "xp": entry.get("xp", 0),
+        "level": level,
+        "messages": entry.get("messages", 0),
+        "last_message": entry.get("last_message"),
+        "streak": entry.get("streak", 0)
+    }
+
+class RecordWriter:
+    """CSV or NDJSON output, one record at a time"""
+
+    def __init__(self, output, fmt):
+        self.fmt = fmt
+        self.f = sys.stdout if output == "-" else open(output, "w", encoding="utf-8", newline="")
+        self.csv = None
+        if fmt == "csv":
+            self.csv = csv.DictWriter(self.f, fieldnames=None)
+
+    def write(self, record):
+        if self.csv is not None:
+            if self.csv.fieldnames is None:
+                self.csv.fieldnames = list(record)
+                self.csv.writeheader()
+            self.csv.writerow(record)
+        else:
+            self.f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self.f is not sys.stdout:
+            self.f.close()
+
+def cmd_export(args):
+    writer = RecordWriter(args.output, args.format)
+    count = 0
+    try:
+        for row in iter_recomputed(iter_source(args.source), args.batch_size):
+            writer.write(to_record(*row))
+            count += 1
+    finally:
+        writer.close()
+    print(f"Exported {count} entries", file=sys.stderr)
+
+def cmd_leaderboard(args):
+    """Top N per guild; only N entries per guild are held in memory"""
+    writer = RecordWriter(args.output, args.format)
+    try:
+        for gid, rows in groupby(iter_source(args.source), key=lambda row: row[0]):
+            ranked = heapq.nsmallest(args.top, rows, key=lambda row: (-row[2].get("xp", 0), row[1]))
+            levels = levels_from_xp(entry.get("xp", 0) for _, _, entry in ranked)
+            for rank, ((_, uid, entry), level) in enumerate(zip(ranked, levels), start=1):
+                record = to_record(gid, uid, entry, level)
+                record["rank"] = rank
+                writer.write(record)
+    finally:
+        writer.close()
+
+def cmd_summary(args):
+    """Per-guild aggregates: O(guilds) memory"""
+    summaries = {}
+    for gid, uid, entry, level in iter_recomputed(iter_source(args.source), args.batch_size):
+        summary = summaries.get(gid)
+        if summary is None:
+            summary = summaries[gid] = {"guild_id": gid, "users": 0, "total_xp": 0, "total_messages": 0, "max_xp": 0, "max_level": 1}
+        xp = entry.get("xp", 0)
+        summary["users"] += 1
+        summary["total_xp"] += xp
+        summary["total_messages"] += entry.get("messages", 0)
+        summary["max_xp"] = max(summary["max_xp"], xp)
+        summary["max_level"] = max(summary["max_level"], level)
+
+    writer = RecordWriter(args.output, args.format)
+    try:
+        for summary in summaries.values():
+            summary["avg_xp"] = round(summary["total_xp"] / summary["users"], 2) if summary["users"] else 0
+            writer.write(summary)
+    finally:
+        writer.close()
+
+def write_level_json(rows, path):
+    """Write guild-grouped (gid, uid, entry) rows as leveldata.json, atomically"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".leveldata-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write("{")
+            current = None
+            for gid, uid, entry in rows:
+                if gid != current:
+                    f.write(("}, " if current is not None else "") + json.dumps(gid) + ": {")
+                    current = gid
+                else:
+                    f.write(", ")
+                f.write(json.dumps(uid) + ": " + json.dumps(entry))
+            f.write("}}" if current is not None else "}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def cmd_recompute(args):
+    """Rewrite stored levels from the current get_xp_for_level curve"""
+    changed = 0
+
+    if is_db_path(args.source):
+        conn = connect_level_db(args.source)
+        try:
+            pending = []
+            for gid, uid, entry, level in iter_recomputed(iter_level_db(args.source), args.batch_size):
+                if entry.get("level") != level:
+                    pending.append((level, gid, uid))
+                if len(pending) >= args.batch_size:
+                    with conn:
+                        conn.executemany("UPDATE levels SET level = ? WHERE guild_id = ? AND user_id = ?", pending)
+                    changed += len(pending)
+                    pending = []
+            if pending:
+                with conn:
+                    conn.executemany("UPDATE levels SET level = ? WHERE guild_id = ? AND user_id = ?", pending)
+                changed += len(pending)
+        finally:
+            conn.close()
+    else:
+        def updated():
+            nonlocal changed
+            for gid, uid, entry, level in iter_recomputed(iter_level_file(args.source), args.batch_size):
+                if entry.get("level") != level:
+                    entry["level"] = level
+                    changed += 1
+                yield gid, uid, entry
+
+        write_level_json(updated(), args.source)
+
+    print(f"Recomputed levels, {changed} entries changed", file=sys.stderr)
+
+def main(argv=None):
+    default_source = LEVEL_DB if LEVEL_BACKEND == "sqlite" else LEVEL_FILE
+    parser = argparse.ArgumentParser(prog="python -m cogs.level_tool", description="Offline VANTAX level data tools")
+    parser.add_argument("--source", default=default_source, help=f"leveldata.json or SQLite file (default: {default_source})")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per vectorized level batch")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, func, help_text in (
+        ("export", cmd_export, "export every entry with recomputed levels"),
+        ("leaderboard", cmd_leaderboard, "export the top N per guild"),
+        ("summary", cmd_summary, "per-guild summaries")
+    ):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--format", choices=("csv", "ndjson"), default="ndjson")
+        sub.add_argument("--output", default="-", help="output file (default: stdout)")
+        sub.set_defaults(func=func)
+        if name == "leaderboard":
+            sub.add_argument("--top", type=int, default=10)
+
+    sub = subparsers.add_parser("recompute", help="rewrite stored levels in place (stop the bot first)")
+    sub.set_defaults(func=cmd_recompute)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
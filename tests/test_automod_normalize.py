@@ -0,0 +1,37 @@
+import pytest
+
+from cogs.automod import BannedWordMatcher, normalize_text
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("h3ll0 w0rld", "hello world"),
+    ("1d10t!!", "idiot!!"),
+    ("$hit", "shit"),
+    ("you @ss", "you ass"),
+    ("n00b", "noob"),
+])
+def test_leetspeak_in_words_is_mapped(text, expected):
+    assert normalize_text(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "i have 455 apples",
+    "x1337",
+    "call 0800 555",
+    "user@example.com",
+    "https://h3ll0.com/x1",
+    "www.t3st.de",
+])
+def test_numbers_emails_and_urls_are_kept(text):
+    assert normalize_text(text) == text
+
+
+def test_plain_numbers_do_not_match_banned_words():
+    matcher = BannedWordMatcher(["ass"])
+    assert matcher.find(normalize_text("I have 455 apples")) is None
+    assert matcher.find(normalize_text("you @ss")) == "ass"
+
+
+def test_numeric_banned_word_matches_inside_token():
+    matcher = BannedWordMatcher(["1337"])
+    assert matcher.find(normalize_text("x1337")) == "1337"